@@ -0,0 +1,199 @@
+"""
+Ringmaster Asset Delivery — response compression and in-memory static assets.
+
+CompressionMiddleware compresses complete (non-streaming) responses above a size
+threshold with brotli when the client accepts it and the optional `brotli`
+package is installed, otherwise gzip.
+
+StaticAssets replaces StaticFiles for the hub GUI: every file in public/ is read
+once at startup, hashed and pre-compressed in memory. Non-HTML assets are also
+served under content-hashed names (app.3f9a1c2e7b44.js) with immutable cache
+headers, and index.html is rewritten to reference those names.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # Optional — gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _accepted_encodings(headers) -> set:
+    for name, value in headers:
+        if name == b"accept-encoding":
+            return {part.split(";")[0].strip() for part in value.decode("latin-1").lower().split(",")}
+    return set()
+
+
+def _is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def pick_encoding(accepted: set) -> Optional[str]:
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Compress complete HTTP responses of compressible types larger than `minimum_size` bytes."""
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = pick_encoding(_accepted_encodings(scope["headers"]))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        passthrough = False
+
+        async def snd(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            headers = {k.lower(): v for k, v in start_message.get("headers", [])}
+            body = message.get("body", b"")
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (message.get("more_body")  # Streaming responses go out as-is
+                    or b"content-encoding" in headers
+                    or len(body) < self.minimum_size
+                    or not _is_compressible(content_type)):
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+
+            compressed = compress(body, encoding)
+            raw_headers = [(k, v) for k, v in start_message.get("headers", [])
+                           if k.lower() not in (b"content-length", b"vary")]
+            raw_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": raw_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, snd)
+
+
+class _Asset:
+    __slots__ = ("body", "content_type", "etag", "encoded", "cache_control")
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.cache_control = cache_control
+        self.encoded: Dict[str, bytes] = {}
+        if _is_compressible(content_type) and len(body) >= 256:
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=9)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=11)
+
+
+class StaticAssets:
+    """ASGI app serving a directory from memory with strong ETags and pre-compressed variants."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, _Asset] = {}
+        self.hashed_names: Dict[str, str] = {}
+        self.load()
+
+    def load(self):
+        """(Re)read the directory. Non-HTML files get content-hashed aliases, then HTML is rewritten to use them."""
+        files: Dict[str, bytes] = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                full = os.path.join(root, name)
+                rel = os.path.relpath(full, self.directory).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    files[rel] = f.read()
+
+        assets, hashed = {}, {}
+        for rel, body in files.items():
+            if rel.endswith(".html"):
+                continue
+            content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+            stem, ext = os.path.splitext(rel)
+            hashed_name = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+            assets[rel] = _Asset(body, content_type, REVALIDATE)
+            assets[hashed_name] = _Asset(body, content_type, IMMUTABLE)
+            hashed[rel] = hashed_name
+
+        ref = re.compile(r'''((?:src|href)=["'])([^"'?#]+)(["'])''')
+        for rel, body in files.items():
+            if not rel.endswith(".html"):
+                continue
+            html = ref.sub(lambda m: m.group(1) + hashed.get(m.group(2), m.group(2)) + m.group(3),
+                           body.decode("utf-8"))
+            assets[rel] = _Asset(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE)
+
+        self.assets, self.hashed_names = assets, hashed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"].lstrip("/") or "index.html"
+        if path.endswith("/"):
+            path += "index.html"
+        asset = self.assets.get(path)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            status = 404 if asset is None else 405
+            body = b"Not Found" if asset is None else b"Method Not Allowed"
+            await send({"type": "http.response.start", "status": status,
+                        "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]})
+            return await send({"type": "http.response.body", "body": body})
+
+        body, encoding = asset.body, None
+        accepted = _accepted_encodings(scope["headers"])
+        for candidate in ("br", "gzip"):
+            if candidate in accepted and candidate in asset.encoded:
+                body, encoding = asset.encoded[candidate], candidate
+                break
+        # Strong ETags must differ per representation, so encoded variants get a suffix.
+        etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if_none_match = next((v for k, v in scope["headers"] if k == b"if-none-match"), None)
+        if if_none_match is not None and etag.encode() in [t.strip() for t in if_none_match.split(b",")]:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            return await send({"type": "http.response.body", "body": b""})
+
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+        headers += [(b"content-type", asset.content_type.encode()), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
@@ -1,15 +1,23 @@
 import asyncio
+import base64
+import fnmatch
 import json
 import httpx
 import os
 import sys
 import time
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.staticfiles import StaticFiles
+from urllib.parse import quote
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
+
+import assets
+import tracing
+import traffic
+from vault_index import VaultIndex
 
 app = FastAPI(title="Self-R Ringmaster")
 
@@ -19,13 +27,101 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[tracing.TRACE_HEADER],
 )
 
+# Compress large JSON bodies (e.g. /api/vault). Static assets arrive pre-compressed and are skipped.
+app.add_middleware(assets.CompressionMiddleware, minimum_size=int(os.environ.get("RINGMASTER_COMPRESS_MIN", "1024")))
+
 # In-memory store of connected sub-swarm nodes
 active_nodes: Dict[str, Dict[str, Any]] = {}
 
-# Active UI WebSocket connections (The Hub)
-ui_connections: List[WebSocket] = []
+# Active UI WebSocket connections (The Hub) → subscribed topics (None = every event)
+ui_connections: Dict[WebSocket, Optional[Set[str]]] = {}
+
+# In-flight hub → Wagon dispatches, so a UI can cancel them
+dispatch_tasks: Dict[str, asyncio.Task] = {}
+
+# Runtime state (registry snapshot, vault index) lives here, relative to the hub's working directory
+STATE_DIR = os.environ.get("RINGMASTER_STATE_DIR", "state")
+
+# ─── TRACING ────────────────────────────────────────────────────────────────
+# Every /api request carries a trace ID and a deadline; both are forwarded to Wagons.
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    path = request.url.path
+    if not path.startswith("/api/") or path.startswith("/api/traces"):
+        return await call_next(request)
+    ctx = tracing.context_from_headers(request.headers)
+    token = tracing.activate(ctx)
+    try:
+        if ctx.expired():
+            return JSONResponse({"error": "Deadline exceeded before processing."}, status_code=504,
+                                headers={tracing.TRACE_HEADER: ctx.trace_id})
+        with tracing.span(f"{request.method} {path}"):
+            response = await call_next(request)
+    finally:
+        tracing.deactivate(token)
+    response.headers[tracing.TRACE_HEADER] = ctx.trace_id
+    return response
+
+# Traffic capture for replay-based regression testing (see traffic.py). Added last so it sits outermost.
+recorder = traffic.TrafficRecorder.from_env()
+if recorder:
+    app.add_middleware(traffic.RecordingMiddleware, recorder=recorder)
+
+# One pooled client for all Wagon traffic, so keep-alive connections survive across requests
+# and can be opened ahead of time on warm restart.
+wagon_client: Optional[httpx.AsyncClient] = None
+
+def get_wagon_client() -> httpx.AsyncClient:
+    global wagon_client
+    if wagon_client is None or wagon_client.is_closed:
+        wagon_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=120.0),
+        )
+    return wagon_client
+
+def record_health(node_id: Optional[str], ok: bool):
+    """Exponentially weighted success rate of calls to a Wagon (1.0 = always answers)."""
+    node = active_nodes.get(node_id) if node_id else None
+    if node is not None:
+        node["health"] = round(0.8 * node.get("health", 1.0) + (0.2 if ok else 0.0), 3)
+
+async def call_wagon(method: str, url: str, span_name: str, timeout: float,
+                     node_id: Optional[str] = None, **kwargs) -> httpx.Response:
+    """Issue a traced request to a Wagon, forwarding the trace ID and remaining deadline."""
+    tracing.check_deadline(span_name)
+    with tracing.span(span_name, url=url) as sp:
+        start = time.monotonic()
+        try:
+            res = await get_wagon_client().request(method, url, headers=tracing.outgoing_headers(),
+                                                   timeout=tracing.timeout_for(timeout), **kwargs)
+        except httpx.HTTPError:
+            record_health(node_id, False)
+            raise
+        record_health(node_id, res.status_code < 500)
+        if sp is not None:
+            sp.attrs["status_code"] = res.status_code
+        tracing.record_server_timing(sp, res.headers.get("server-timing"))
+        if recorder:
+            recorder.wagon(method, url, res.status_code, res.text, time.monotonic() - start)
+        return res
+
+@app.get("/api/traces")
+async def list_traces(limit: int = 50):
+    """Most recent traces, newest first."""
+    return {"traces": tracing.store.recent(limit)}
+
+@app.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Waterfall view of a single trace: spans ordered by start with offsets and depth."""
+    trace = tracing.store.waterfall(trace_id)
+    if trace is None:
+        return {"error": f"Trace '{trace_id}' not found."}
+    return trace
 
 def redraw_cli():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -81,12 +177,16 @@ async def register_node(node: NodeRegistration):
             "url": f"http://{node.ip}:{node.port}",
             "role": node.role,
             "status": "IDLE",
-            "last_ping": now
+            "last_ping": now,
+            "health": 1.0,
+            "confirmed": True,
         }
     else:
         active_nodes[node_id]["url"] = f"http://{node.ip}:{node.port}"
         active_nodes[node_id]["role"] = node.role
         active_nodes[node_id]["last_ping"] = now
+        if not active_nodes[node_id].get("confirmed", True):
+            confirm_node(node_id)
     await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
     redraw_cli()
     return {"status": "registered", "node_id": node_id}
@@ -94,30 +194,35 @@ async def register_node(node: NodeRegistration):
 @app.post("/api/swarm/dispatch")
 async def dispatch_swarm(payload: SwarmTaskPayload):
     """UI uses this to dispatch an objective to the swarm."""
+    return await dispatch_objective(payload)
+
+async def dispatch_objective(payload: SwarmTaskPayload) -> dict:
+    """Route an objective to a Wagon and start its debate. Shared by the REST endpoint and the /ws channel."""
     objective = payload.objective
     
     # Simple routing logic
     target_url = None
     target_id = None
     
-    if payload.target_node_id and payload.target_node_id in active_nodes:
-        target_id = payload.target_node_id
-        target_url = active_nodes[target_id]["url"]
-    elif payload.role_target:
-        # Find first node with matching role
-        for nid, ninfo in active_nodes.items():
-            if ninfo["role"].upper() == payload.role_target.upper() and ninfo["status"] == "IDLE":
-                target_id = nid
-                target_url = ninfo["url"]
-                break
-    
-    # Fallback to any IDLE node
-    if not target_url:
-        for nid, ninfo in active_nodes.items():
-            if ninfo["status"] == "IDLE":
-                target_id = nid
-                target_url = ninfo["url"]
-                break
+    with tracing.span("hub.route"):
+        if payload.target_node_id and payload.target_node_id in active_nodes:
+            target_id = payload.target_node_id
+            target_url = active_nodes[target_id]["url"]
+        elif payload.role_target:
+            # Find first node with matching role
+            for nid, ninfo in active_nodes.items():
+                if ninfo["role"].upper() == payload.role_target.upper() and ninfo["status"] == "IDLE":
+                    target_id = nid
+                    target_url = ninfo["url"]
+                    break
+        
+        # Fallback to any IDLE node
+        if not target_url:
+            for nid, ninfo in active_nodes.items():
+                if ninfo["status"] == "IDLE":
+                    target_id = nid
+                    target_url = ninfo["url"]
+                    break
                 
     if not target_url:
         return {"error": "No available nodes to process this objective."}
@@ -130,72 +235,264 @@ async def dispatch_swarm(payload: SwarmTaskPayload):
 
     # Fire API request to the sub-swarm
     async def fire_and_forget():
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            try:
-                # Assuming the sub-node's /api/swarm/execute endpoint exists based on earlier implementation
-                req_payload = {
-                    "objective": objective,
-                    "visionary": payload.visionary,
-                    "critic": payload.critic,
-                    "tactician": payload.tactician,
-                    "auto_approve": False # Set to false so UI can intercept
-                }
-                res = await client.post(f"{target_url}/api/swarm/execute", json=req_payload)
-                if target_id in active_nodes:
-                    active_nodes[target_id]["status"] = "AWAITING HUMAN"
-                    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
-            except Exception as e:
-                print(f"Failed to dispatch to {target_url}: {e}")
-                if target_id in active_nodes:
-                    active_nodes[target_id]["status"] = "ERROR"
-                    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
-
-    asyncio.create_task(fire_and_forget())
-    return {"status": "dispatched", "target": target_id}
+        try:
+            # Assuming the sub-node's /api/swarm/execute endpoint exists based on earlier implementation
+            req_payload = {
+                "objective": objective,
+                "visionary": payload.visionary,
+                "critic": payload.critic,
+                "tactician": payload.tactician,
+                "auto_approve": False # Set to false so UI can intercept
+            }
+            res = await call_wagon("POST", f"{target_url}/api/swarm/execute", "wagon.execute",
+                                   timeout=300.0, node_id=target_id, json=req_payload)
+            if target_id in active_nodes:
+                active_nodes[target_id]["status"] = "AWAITING HUMAN"
+                await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+        except tracing.DeadlineExceeded as e:
+            if target_id in active_nodes:
+                active_nodes[target_id]["status"] = "IDLE"
+                await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+            await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> ⌛ {e}"})
+        except Exception as e:
+            print(f"Failed to dispatch to {target_url}: {e}")
+            if target_id in active_nodes:
+                active_nodes[target_id]["status"] = "ERROR"
+                await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+        finally:
+            if dispatch_tasks.get(target_id) is asyncio.current_task():
+                del dispatch_tasks[target_id]
+
+    dispatch_tasks[target_id] = asyncio.create_task(fire_and_forget())
+    ctx = tracing.current()
+    return {"status": "dispatched", "target": target_id, "trace_id": ctx.trace_id if ctx else None}
+
+async def approve_plan(node_id: str, tasks: Optional[List[dict]] = None) -> dict:
+    """Approve the plan a Wagon is holding for human review and let it deploy the swarm."""
+    node = active_nodes.get(node_id)
+    if node is None:
+        return {"error": f"Node '{node_id}' not found."}
+    if node["status"] != "AWAITING HUMAN":
+        return {"error": f"Node '{node_id}' has no plan awaiting approval (status: {node['status']})."}
+    node["status"] = "DEPLOYING"
+    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> Plan on {node_id} APPROVED. Deploying swarm..."})
+
+    async def deploy():
+        status, log = "IDLE", f"> ✅ Swarm deployment on {node_id} complete."
+        try:
+            res = await call_wagon("POST", f"{node['url']}/api/swarm/approve", "wagon.approve",
+                                   timeout=300.0, node_id=node_id, json={"tasks": tasks} if tasks else {})
+            if res.status_code >= 400:
+                status, log = "ERROR", f"> ❌ Swarm deployment on {node_id} failed: {res.json().get('error', res.status_code)}"
+        except Exception as e:
+            status, log = "ERROR", f"> ❌ Swarm deployment on {node_id} failed: {e}"
+        if node_id in active_nodes:
+            active_nodes[node_id]["status"] = status
+            await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+        await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": log})
+
+    asyncio.create_task(deploy())
+    return {"status": "approved", "node_id": node_id}
+
+async def cancel_objective(node_id: str) -> dict:
+    """Stop waiting on an in-flight dispatch and reject any plan the Wagon is holding."""
+    node = active_nodes.get(node_id)
+    if node is None:
+        return {"error": f"Node '{node_id}' not found."}
+    task = dispatch_tasks.pop(node_id, None)
+    if task is not None and not task.done():
+        task.cancel()
+    try:
+        res = await call_wagon("POST", f"{node['url']}/api/swarm/reject", "wagon.reject", timeout=10.0, node_id=node_id)
+        wagon = res.json()
+    except Exception as e:
+        wagon = {"error": str(e)}
+    node["status"] = "IDLE"
+    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> Objective on {node_id} CANCELLED by human commander."})
+    return {"status": "cancelled", "node_id": node_id, "wagon": wagon}
 
 # ─── VAULT PROXY ENDPOINTS ──────────────────────────────────────────────────
 # These proxy requests to the individual Wagon nodes' /api/completions endpoints
 
+# Listings (names + size/mtime, never contents) are cached briefly so paging through
+# a large vault doesn't re-list every Wagon on every page.
+LISTING_TTL = float(os.environ.get("RINGMASTER_LISTING_TTL", "5"))
+VAULT_SORT_KEYS = ("name", "mtime", "size", "node")
+VAULT_PAGE_MAX = 1000
+_listing_cache: Dict[str, tuple] = {}  # node_id -> (fetched_at, entries)
+
+async def fetch_vault_listing(node_id: str, max_age: float = LISTING_TTL) -> List[dict]:
+    """Return [{"name", "size", "mtime"}] for a Wagon, from cache when fresher than `max_age`."""
+    cached = _listing_cache.get(node_id)
+    if cached and time.time() - cached[0] < max_age:
+        return cached[1]
+    url = active_nodes[node_id]["url"]
+    res = await call_wagon("GET", f"{url}/api/completions?meta=1", "wagon.completions", timeout=10.0, node_id=node_id)
+    data = res.json()
+    # Wagons without listing metadata report names only; size/mtime stay None.
+    entries = data.get("entries") or [{"name": f, "size": None, "mtime": None} for f in data.get("files", [])]
+    _listing_cache[node_id] = (time.time(), entries)
+    return entries
+
+def invalidate_vault_listing(node_id: str):
+    _listing_cache.pop(node_id, None)
+
+def _vault_sort_key(item: dict, sort: str) -> list:
+    value = {
+        "name": item["filename"],
+        "mtime": item.get("mtime") if item.get("mtime") is not None else -1,
+        "size": item.get("size") if item.get("size") is not None else -1,
+        "node": item["node_id"],
+    }[sort]
+    return [value, item["node_id"], item["filename"]]
+
+def encode_cursor(sort: str, order: str, key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, order, key]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str) -> list:
+    try:
+        cursor_sort, cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Malformed cursor.") from e
+    if cursor_sort != sort or cursor_order != order:
+        raise ValueError("Cursor was issued for a different sort order.")
+    return key
+
+def page_vault(items: List[dict], sort: str, order: str, limit: int, cursor: Optional[str]) -> dict:
+    """Keyset pagination: sort by (sort value, node_id, filename) and return the page after `cursor`."""
+    if sort not in VAULT_SORT_KEYS:
+        raise ValueError(f"sort must be one of {', '.join(VAULT_SORT_KEYS)}.")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be 'asc' or 'desc'.")
+    desc = order == "desc"
+    items = sorted(items, key=lambda i: _vault_sort_key(i, sort), reverse=desc)
+    total = len(items)
+    if cursor:
+        after = decode_cursor(cursor, sort, order)
+        items = [i for i in items if (_vault_sort_key(i, sort) < after if desc else _vault_sort_key(i, sort) > after)]
+    limit = max(1, min(limit, VAULT_PAGE_MAX))
+    page = items[:limit]
+    next_cursor = encode_cursor(sort, order, _vault_sort_key(page[-1], sort)) if len(items) > limit else None
+    return {"items": page, "total": total, "next_cursor": next_cursor}
+
+def filter_vault(items: List[dict], ext: Optional[str], name: Optional[str], since: Optional[float]) -> List[dict]:
+    """Server-side filters: extension (".ts" or "ts,py"), filename glob, and modified-since (epoch seconds)."""
+    if ext:
+        exts = tuple("." + e.strip().lstrip(".").lower() for e in ext.split(",") if e.strip())
+        items = [i for i in items if i["filename"].lower().endswith(exts)]
+    if name:
+        items = [i for i in items if fnmatch.fnmatchcase(i["filename"].lower(), name.lower())]
+    if since is not None:
+        items = [i for i in items if i.get("mtime") is not None and i["mtime"] / 1000.0 >= since]
+    return items
+
 @app.get("/api/vault")
-async def vault_aggregate():
-    """Fetch completion file lists from ALL connected wagons and aggregate them."""
-    result = []
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        for node_id, node in active_nodes.items():
-            try:
-                res = await client.get(f"{node['url']}/api/completions")
-                data = res.json()
-                for fname in data.get("files", []):
-                    result.append({"node_id": node_id, "url": node["url"], "filename": fname})
-            except Exception as e:
-                result.append({"node_id": node_id, "url": node["url"], "error": str(e)})
-    return {"vault": result}
+async def vault_aggregate(limit: int = 200, cursor: Optional[str] = None, node: Optional[str] = None,
+                          role: Optional[str] = None, ext: Optional[str] = None, name: Optional[str] = None,
+                          since: Optional[float] = None, sort: str = "name", order: str = "asc"):
+    """Fetch completion listings from ALL connected wagons, then filter, sort and page them on the hub."""
+    nodes = [
+        (nid, n) for nid, n in list(active_nodes.items())
+        if (not node or nid == node) and (not role or n["role"].upper() == role.upper())
+    ]
+    listings = await asyncio.gather(*[fetch_vault_listing(nid) for nid, _ in nodes], return_exceptions=True)
+
+    items, errors = [], []
+    for (node_id, n), listing in zip(nodes, listings):
+        if isinstance(listing, Exception):
+            errors.append({"node_id": node_id, "url": n["url"], "error": str(listing)})
+            continue
+        for e in listing:
+            items.append({"node_id": node_id, "url": n["url"], "role": n["role"],
+                          "filename": e["name"], "size": e.get("size"), "mtime": e.get("mtime")})
+    try:
+        page = page_vault(filter_vault(items, ext, name, since), sort, order, limit, cursor)
+    except ValueError as e:
+        return {"error": f"Invalid vault query: {e}"}
+    return {"vault": page["items"], "total": page["total"], "next_cursor": page["next_cursor"], "errors": errors}
+
+# ─── VAULT SEARCH ───────────────────────────────────────────────────────────
+# Full-text index of completion contents, filled incrementally by a background crawl.
+
+INDEX_PATH = os.path.join(STATE_DIR, "vault_index.db")
+INDEX_INTERVAL = float(os.environ.get("RINGMASTER_INDEX_INTERVAL", "60"))
+INDEX_MAX_FILE_BYTES = 2 * 1024 * 1024
+INDEX_FETCH_CONCURRENCY = 8
+vault_index: Optional[VaultIndex] = None
+
+def get_vault_index() -> VaultIndex:
+    global vault_index
+    if vault_index is None:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        vault_index = VaultIndex(INDEX_PATH)
+    return vault_index
+
+async def crawl_node_completions(node_id: str) -> dict:
+    """Index new or changed completions on one Wagon, detected by listing size/mtime and content hash."""
+    index = get_vault_index()
+    # Wagons without listing metadata only get new files indexed; changes can't be detected cheaply.
+    entries = await fetch_vault_listing(node_id, max_age=0)
+    fetch, removed = await asyncio.to_thread(index.plan, node_id, entries)
+    await asyncio.to_thread(index.remove, node_id, removed)
+
+    sem = asyncio.Semaphore(INDEX_FETCH_CONCURRENCY)
+
+    async def index_one(entry: dict):
+        if (entry.get("size") or 0) > INDEX_MAX_FILE_BYTES:
+            await asyncio.to_thread(index.skip, node_id, entry["name"], entry.get("size"), entry.get("mtime"))
+            return "skipped"
+        async with sem:
+            r = await call_wagon("GET", f"{active_nodes[node_id]['url']}/api/completions/{quote(entry['name'])}", "wagon.completion",
+                                 timeout=30.0, node_id=node_id)
+        if r.status_code != 200:
+            return False
+        return await asyncio.to_thread(index.upsert, node_id, entry["name"], entry.get("size"), entry.get("mtime"), r.text)
+
+    results = await asyncio.gather(*[index_one(e) for e in fetch], return_exceptions=True)
+    return {"listed": len(entries), "fetched": len(fetch), "indexed": sum(r is True for r in results),
+            "skipped": sum(r == "skipped" for r in results), "removed": len(removed)}
+
+@app.get("/api/vault/search")
+async def vault_search(q: str, limit: int = 20, node_id: Optional[str] = None):
+    """Ranked full-text search over all indexed completions, with highlighted snippets."""
+    start = time.perf_counter()
+    results = await asyncio.to_thread(get_vault_index().search, q, max(1, min(limit, 200)), node_id)
+    return {"query": q, "results": results, "took_ms": round((time.perf_counter() - start) * 1000, 2)}
 
 @app.get("/api/vault/{node_id}")
-async def vault_node_files(node_id: str):
-    """Fetch completions from a specific Wagon node."""
+async def vault_node_files(node_id: str, limit: int = 200, cursor: Optional[str] = None, ext: Optional[str] = None,
+                           name: Optional[str] = None, since: Optional[float] = None,
+                           sort: str = "name", order: str = "asc"):
+    """Fetch completions from a specific Wagon node, filtered, sorted and paged."""
     if node_id not in active_nodes:
         return {"error": f"Node '{node_id}' not found."}
-    url = active_nodes[node_id]["url"]
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            res = await client.get(f"{url}/api/completions")
-            return res.json()
-        except Exception as e:
-            return {"error": str(e)}
+    try:
+        listing = await fetch_vault_listing(node_id)
+    except Exception as e:
+        return {"error": str(e)}
+    items = [{"node_id": node_id, "filename": e["name"], "size": e.get("size"), "mtime": e.get("mtime")} for e in listing]
+    try:
+        page = page_vault(filter_vault(items, ext, name, since), sort, order, limit, cursor)
+    except ValueError as e:
+        return {"error": f"Invalid vault query: {e}"}
+    return {
+        "files": [i["filename"] for i in page["items"]],
+        "entries": [{"name": i["filename"], "size": i["size"], "mtime": i["mtime"]} for i in page["items"]],
+        "total": page["total"],
+        "next_cursor": page["next_cursor"],
+    }
 
 @app.delete("/api/vault/{node_id}/{filename}")
 async def vault_delete_file(node_id: str, filename: str):
     """Delete a completion file from a specific Wagon node's vault."""
     if node_id not in active_nodes:
         return {"error": f"Node '{node_id}' not found."}
-    url = active_nodes[node_id]["url"]
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            res = await client.delete(f"{url}/api/completions/{filename}")
-            return res.json()
-        except Exception as e:
-            return {"error": str(e)}
+    try:
+        return await delete_completion(node_id, filename)
+    except Exception as e:
+        return {"error": str(e)}
 
 class LearnPayload(BaseModel):
     filename: str
@@ -206,13 +503,113 @@ async def vault_learn(node_id: str, payload: LearnPayload):
     """Proxy a completion file to a Wagon node's /api/learn endpoint for LLM ingestion."""
     if node_id not in active_nodes:
         return {"error": f"Node '{node_id}' not found."}
+    try:
+        return await learn_completion(node_id, payload.filename, payload.contents)
+    except Exception as e:
+        return {"error": str(e)}
+
+async def delete_completion(node_id: str, filename: str) -> dict:
+    url = active_nodes[node_id]["url"]
+    res = await call_wagon("DELETE", f"{url}/api/completions/{quote(filename)}", "wagon.delete",
+                           timeout=10.0, node_id=node_id)
+    if not 200 <= res.status_code < 300:
+        # The completion is still on the Wagon, so it stays listed and searchable
+        raise RuntimeError(f"Could not delete {filename}: HTTP {res.status_code}")
+    invalidate_vault_listing(node_id)
+    await asyncio.to_thread(get_vault_index().remove, node_id, [filename])
+    return res.json()
+
+async def learn_completion(node_id: str, filename: str, contents: Optional[str] = None) -> dict:
+    """Send a completion to the Wagon's /api/learn, fetching its contents from the Wagon when not supplied."""
     url = active_nodes[node_id]["url"]
-    async with httpx.AsyncClient(timeout=120.0) as client:
+    if contents is None:
+        r = await call_wagon("GET", f"{url}/api/completions/{quote(filename)}", "wagon.completion",
+                             timeout=30.0, node_id=node_id)
+        if r.status_code != 200:
+            raise RuntimeError(f"Could not fetch {filename}: HTTP {r.status_code}")
+        contents = r.text
+    res = await call_wagon("POST", f"{url}/api/learn", "wagon.learn", timeout=120.0, node_id=node_id,
+                           json={"filename": filename, "contents": contents})
+    return res.json()
+
+# ─── VAULT BATCH OPERATIONS ─────────────────────────────────────────────────
+
+VAULT_BATCH_OPS = {"delete", "learn"}
+
+class VaultBatchItem(BaseModel):
+    node_id: str
+    filename: str
+    op: str                         # "delete" | "learn"
+    contents: Optional[str] = None  # learn only; fetched from the Wagon when omitted
+
+class VaultBatchPayload(BaseModel):
+    items: List[VaultBatchItem]
+    concurrency: int = 4            # max in-flight operations per Wagon
+
+@app.post("/api/vault/batch")
+async def vault_batch(payload: VaultBatchPayload):
+    """
+    Run many delete/learn operations at once. Items are grouped per Wagon and run with bounded
+    per-node concurrency. Results stream back as NDJSON, one line per item as it finishes,
+    followed by a final {"summary": ...} line with aggregate timing.
+    """
+    start = time.perf_counter()
+    per_node_limit = max(1, min(payload.concurrency, 32))
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def run(item: VaultBatchItem):
+        queued = t0 = time.perf_counter()
+        out = {"node_id": item.node_id, "filename": item.filename, "op": item.op}
         try:
-            res = await client.post(f"{url}/api/learn", json={"filename": payload.filename, "contents": payload.contents})
-            return res.json()
+            if item.op not in VAULT_BATCH_OPS:
+                raise ValueError(f"Unknown op '{item.op}'.")
+            if item.node_id not in active_nodes:
+                raise KeyError(f"Node '{item.node_id}' not found.")
+            async with semaphores.setdefault(item.node_id, asyncio.Semaphore(per_node_limit)):
+                t0 = time.perf_counter()
+                out["queued_ms"] = round((t0 - queued) * 1000, 2)
+                if item.op == "delete":
+                    out["result"] = await delete_completion(item.node_id, item.filename)
+                else:
+                    out["result"] = await learn_completion(item.node_id, item.filename, item.contents)
+            out["ok"] = not (isinstance(out["result"], dict) and out["result"].get("error"))
         except Exception as e:
-            return {"error": str(e)}
+            out["ok"] = False
+            out["error"] = str(e.args[0]) if isinstance(e, KeyError) and e.args else str(e)
+        out["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        await results.put(out)
+
+    async def stream():
+        tasks = [asyncio.create_task(run(item)) for item in payload.items]
+        per_node: Dict[str, Dict[str, Any]] = {}
+        ok = 0
+        try:
+            for _ in tasks:
+                out = await results.get()
+                stats = per_node.setdefault(out["node_id"], {"count": 0, "ok": 0, "failed": 0, "ms_total": 0.0})
+                stats["count"] += 1
+                stats["ok" if out["ok"] else "failed"] += 1
+                stats["ms_total"] = round(stats["ms_total"] + out["ms"], 2)
+                ok += out["ok"]
+                yield json.dumps(out) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()
+        summary = {
+            "total": len(tasks),
+            "ok": ok,
+            "failed": len(tasks) - ok,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+            "per_node": per_node,
+        }
+        yield json.dumps({"summary": summary}) + "\n"
+        if any(item.op == "delete" for item in payload.items):
+            await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER",
+                                   "log": f"> 🗑 Vault batch: {ok}/{len(tasks)} operation(s) succeeded in {summary['duration_ms']:.0f}ms."},
+                                  topic="vault")
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 # ─── SELF-IMPROVEMENT ENDPOINTS ──────────────────────────────────────────────
 
@@ -222,13 +619,12 @@ async def self_improve_node(node_id: str):
     if node_id not in active_nodes:
         return {"error": f"Node '{node_id}' not found."}
     url = active_nodes[node_id]["url"]
-    await broadcast_to_ui({"type": "terminal_log", "node_id": node_id, "log": f"> Self-improvement cycle triggered on {node_id}..."})
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
-            res = await client.post(f"{url}/api/self-improve")
-            return res.json()
-        except Exception as e:
-            return {"error": str(e)}
+    await broadcast_to_ui({"type": "terminal_log", "node_id": node_id, "log": f"> Self-improvement cycle triggered on {node_id}..."}, topic="meta")
+    try:
+        res = await call_wagon("POST", f"{url}/api/self-improve", "wagon.self_improve", timeout=300.0, node_id=node_id)
+        return res.json()
+    except Exception as e:
+        return {"error": str(e)}
 
 @app.post("/api/self-improve/all")
 async def self_improve_all():
@@ -236,21 +632,20 @@ async def self_improve_all():
     if not active_nodes:
         return {"error": "No connected Wagon nodes."}
 
-    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> 🔄 Global self-improvement initiated on {len(active_nodes)} wagon(s)..."})
+    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> 🔄 Global self-improvement initiated on {len(active_nodes)} wagon(s)..."}, topic="meta")
 
     async def improve_node(node_id: str, url: str):
         try:
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                res = await client.post(f"{url}/api/self-improve")
-                data = res.json()
-                await broadcast_to_ui({
-                    "type": "terminal_log",
-                    "node_id": node_id,
-                    "log": f"> [IMPROVE] {node_id}: improved={data.get('improved',0)}, skipped={data.get('skipped',0)}, failed={data.get('failed',0)}"
-                })
-                return {"node_id": node_id, **data}
+            res = await call_wagon("POST", f"{url}/api/self-improve", "wagon.self_improve", timeout=300.0, node_id=node_id)
+            data = res.json()
+            await broadcast_to_ui({
+                "type": "terminal_log",
+                "node_id": node_id,
+                "log": f"> [IMPROVE] {node_id}: improved={data.get('improved',0)}, skipped={data.get('skipped',0)}, failed={data.get('failed',0)}"
+            }, topic="meta")
+            return {"node_id": node_id, **data}
         except Exception as e:
-            await broadcast_to_ui({"type": "terminal_log", "node_id": node_id, "log": f"> [IMPROVE] {node_id} ERROR: {e}"})
+            await broadcast_to_ui({"type": "terminal_log", "node_id": node_id, "log": f"> [IMPROVE] {node_id} ERROR: {e}"}, topic="meta")
             return {"node_id": node_id, "error": str(e)}
 
     results = await asyncio.gather(*[
@@ -259,43 +654,212 @@ async def self_improve_all():
     ])
 
     total_improved = sum(r.get("improved", 0) for r in results if isinstance(r, dict))
-    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> ✅ Global improve complete. {total_improved} file(s) improved across {len(active_nodes)} wagon(s)."})
+    await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER", "log": f"> ✅ Global improve complete. {total_improved} file(s) improved across {len(active_nodes)} wagon(s)."}, topic="meta")
     return {"status": "complete", "results": list(results), "total_improved": total_improved}
 
 
+# ─── REGISTRY SNAPSHOT / WARM RESTART ────────────────────────────────────────
+# The registry is snapshotted to disk so a restarted hub can show and route to
+# known Wagons within ~1s instead of waiting for the next heartbeat round.
+
+SNAPSHOT_PATH = os.path.join(STATE_DIR, "registry.json")
+SNAPSHOT_INTERVAL = float(os.environ.get("RINGMASTER_SNAPSHOT_INTERVAL", "5"))
+SNAPSHOT_MAX_AGE = 600  # Ignore snapshots older than this — the fleet has likely changed.
+_last_snapshot: Optional[str] = None
+
+def save_registry_snapshot():
+    """Atomically write the node registry (statuses, health scores) to disk if it changed."""
+    global _last_snapshot
+    nodes = json.dumps(list(active_nodes.values()), sort_keys=True)
+    if nodes == _last_snapshot:
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp = SNAPSHOT_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f'{{"saved_at": {time.time()}, "nodes": {nodes}}}')
+    os.replace(tmp, SNAPSHOT_PATH)
+    _last_snapshot = nodes
+
+def confirm_node(node_id: str):
+    """Promote a restored node back to routable once it has proven it is alive."""
+    node = active_nodes[node_id]
+    node["confirmed"] = True
+    # The hub lost track of in-flight dispatches when it restarted, so DRAFTING can't be trusted.
+    last = node.pop("last_status", "IDLE")
+    node["status"] = "IDLE" if last in ("DRAFTING", "UNCONFIRMED") else last
+
+async def restore_registry_snapshot():
+    """Load the last snapshot as unconfirmed nodes, then confirm them with concurrent health probes."""
+    try:
+        with open(SNAPSHOT_PATH, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+    if time.time() - snapshot.get("saved_at", 0) > SNAPSHOT_MAX_AGE:
+        return
+
+    now = time.time()
+    for n in snapshot.get("nodes", []):
+        if n.get("id") in active_nodes:
+            continue
+        active_nodes[n["id"]] = {
+            **n,
+            "status": "UNCONFIRMED",
+            "last_status": n.get("status", "IDLE"),
+            "last_ping": now,
+            "confirmed": False,
+        }
+    if not active_nodes:
+        return
+    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+
+    async def probe(node_id: str, url: str):
+        # Any answer below 500 proves the Wagon is up; older Wagons without /api/health answer 404.
+        # The probe also leaves a warm keep-alive connection in the shared pool.
+        try:
+            res = await get_wagon_client().get(f"{url}/api/health", timeout=1.0)
+            alive = res.status_code < 500
+        except httpx.HTTPError:
+            alive = False
+        if node_id not in active_nodes or active_nodes[node_id].get("confirmed", True):
+            return
+        if alive:
+            confirm_node(node_id)
+        else:
+            del active_nodes[node_id]
+
+    await asyncio.gather(*[
+        probe(nid, n["url"]) for nid, n in list(active_nodes.items()) if not n.get("confirmed", True)
+    ])
+    await broadcast_to_ui({"type": "node_update", "nodes": list(active_nodes.values())})
+    redraw_cli()
+
+# ─── UI WEBSOCKET CHANNEL ───────────────────────────────────────────────────
+# Clients receive every event until they subscribe; after that only events whose
+# type, topic or "terminal_log:<node_id>" they asked for. Commands are JSON messages
+# {"op": ..., "id": ...}; each gets a {"type": "reply", "op", "id", ...} answer.
+#   {"op": "subscribe", "topics": ["node_update", "terminal_log:LXC-101-3000"]}
+#   {"op": "unsubscribe", "topics": ["terminal_log"]}
+#   {"op": "dispatch", "objective": "...", "role_target": "OSINT"}
+#   {"op": "approve", "node_id": "...", "tasks": [...]}   {"op": "cancel", "node_id": "..."}
+# A kiosk can also pick its topics up front: /ws?topics=node_update
+
+UI_TOPICS = {"node_update", "terminal_log", "meta", "vault"}
+
+def parse_topics(raw) -> Set[str]:
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("topics must be a non-empty list.")
+    topics = {str(t).strip() for t in raw if str(t).strip()}
+    unknown = [t for t in topics if t not in UI_TOPICS and not t.startswith("terminal_log:")]
+    if unknown:
+        raise ValueError(f"Unknown topic(s) {sorted(unknown)}. Known: {sorted(UI_TOPICS)} or terminal_log:<node_id>.")
+    return topics
+
+async def handle_ui_command(websocket: WebSocket, msg: dict) -> dict:
+    op = msg.get("op")
+    if op in ("subscribe", "unsubscribe"):
+        topics = parse_topics(msg.get("topics"))
+        current = ui_connections.get(websocket)
+        if op == "subscribe":
+            current = (current or set()) | topics
+        else:
+            current = (UI_TOPICS if current is None else current) - topics
+        ui_connections[websocket] = current
+        return {"topics": sorted(current)}
+    if op not in ("dispatch", "approve", "cancel"):
+        raise ValueError(f"Unknown op '{op}'.")
+
+    # Commands get their own trace, just like a REST request would.
+    token = tracing.activate(tracing.context_from_headers({}))
+    try:
+        with tracing.span(f"WS {op}"):
+            if op == "dispatch":
+                fields = {k: v for k, v in msg.items() if k not in ("op", "id")}
+                return await dispatch_objective(SwarmTaskPayload(**fields))
+            if not msg.get("node_id"):
+                raise ValueError("node_id is required.")
+            if op == "approve":
+                return await approve_plan(msg["node_id"], msg.get("tasks"))
+            return await cancel_objective(msg["node_id"])
+    finally:
+        tracing.deactivate(token)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    ui_connections.append(websocket)
-    
+    topics = None
+    if websocket.query_params.get("topics"):
+        try:
+            topics = parse_topics(websocket.query_params["topics"])
+        except ValueError as e:
+            await websocket.send_json({"type": "reply", "op": "subscribe", "error": str(e)})
+    ui_connections[websocket] = topics
+
     # Send current state immediately
-    await websocket.send_json({"type": "node_update", "nodes": list(active_nodes.values())})
-    
+    if topics is None or "node_update" in topics:
+        await websocket.send_json({"type": "node_update", "nodes": list(active_nodes.values())})
+
     try:
         while True:
             data = await websocket.receive_text()
-            # UI can send commands here
-            pass
+            msg, msg_id = None, None
+            try:
+                msg = json.loads(data)
+                if not isinstance(msg, dict):
+                    raise ValueError("Commands must be JSON objects.")
+                msg_id = msg.get("id")
+                result = await handle_ui_command(websocket, msg)
+            except ValueError as e:  # Includes malformed JSON and payload validation errors
+                result = {"error": str(e)}
+            except Exception as e:  # e.g. approve/cancel against an unreachable Wagon — keep the socket open
+                result = {"error": str(e.args[0]) if isinstance(e, KeyError) and e.args else str(e) or type(e).__name__}
+            await websocket.send_json({"type": "reply", "op": msg.get("op") if isinstance(msg, dict) else None,
+                                       "id": msg_id, **result})
     except WebSocketDisconnect:
-        ui_connections.remove(websocket)
-
-async def broadcast_to_ui(message: dict):
-    for connection in ui_connections:
-        try:
-            await connection.send_json(message)
-        except:
-            pass
+        pass
+    finally:
+        ui_connections.pop(websocket, None)
+
+async def broadcast_to_ui(message: dict, topic: Optional[str] = None):
+    """Send an event to every UI client subscribed to its type, its topic or, for logs, its node."""
+    topics = {message["type"]}
+    if topic:
+        topics.add(topic)
+    if message["type"] == "terminal_log" and message.get("node_id"):
+        topics.add(f"terminal_log:{message['node_id']}")
+    targets = [ws for ws, subs in ui_connections.items() if subs is None or subs & topics]
+    if not targets:
+        return
+    data = json.dumps(message)  # Serialized once for all clients
+    results = await asyncio.gather(*[ws.send_text(data) for ws in targets], return_exceptions=True)
+    for ws, result in zip(targets, results):
+        if isinstance(result, Exception):
+            ui_connections.pop(ws, None)
 
 
 
 # Static files mount MUST be last — mounting before routes causes StaticFiles to intercept
 # WebSocket upgrades and all API requests, crashing the entire server.
-app.mount("/", StaticFiles(directory="public", html=True), name="public")
+# Assets are loaded, hashed and pre-compressed in memory once at startup.
+app.mount("/", assets.StaticAssets(directory="public"), name="public")
 
 @app.on_event("startup")
 async def startup_event():
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
+    await restore_registry_snapshot()
+
+    async def snapshot_registry():
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            try:
+                save_registry_snapshot()
+            except OSError as e:
+                print(f"Registry snapshot failed: {e}")
+    asyncio.create_task(snapshot_registry())
+
     async def initial_draw():
         await asyncio.sleep(1)
         redraw_cli()
@@ -322,6 +886,31 @@ async def startup_event():
 
     asyncio.create_task(prune_stale_nodes())
 
+    async def crawl_vault():
+        """Keep the vault search index in step with every confirmed Wagon."""
+        while True:
+            nodes = [nid for nid, n in active_nodes.items() if n.get("confirmed", True)]
+            results = await asyncio.gather(*[crawl_node_completions(nid) for nid in nodes],
+                                           return_exceptions=True)
+            indexed = sum(r["indexed"] + r["removed"] for r in results if isinstance(r, dict))
+            if indexed:
+                await broadcast_to_ui({"type": "terminal_log", "node_id": "RINGMASTER",
+                                       "log": f"> 🔎 Vault index updated: {indexed} file change(s) across {len(nodes)} wagon(s)."},
+                                      topic="vault")
+            await asyncio.sleep(INDEX_INTERVAL)
+
+    asyncio.create_task(crawl_vault())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    save_registry_snapshot()
+    if wagon_client is not None:
+        await wagon_client.aclose()
+    if vault_index is not None:
+        vault_index.close()
+    if recorder:
+        recorder.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
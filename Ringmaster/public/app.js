@@ -72,6 +72,10 @@ function updateNodes(nodes) {
                 window.open(`${n.url}`, '_blank');
             });
             card.appendChild(btn);
+            card.appendChild(commandButton('[ ✔ APPROVE ]', 'approve', n.id));
+        }
+        if (n.status === 'AWAITING HUMAN' || n.status === 'DRAFTING') {
+            card.appendChild(commandButton('[ ✖ CANCEL ]', 'cancel', n.id));
         }
 
         nodeGrid.appendChild(card);
@@ -79,12 +83,52 @@ function updateNodes(nodes) {
 }
 
 
+function commandButton(label, op, nodeId) {
+    const btn = document.createElement('button');
+    btn.className = 'intervene-btn';
+    btn.innerText = label;
+    btn.addEventListener('click', async (e) => {
+        e.stopPropagation(); // Don't trigger card open
+        if (typeof playSFX === 'function') playSFX('click');
+        const reply = await sendCommand(op, { node_id: nodeId });
+        if (reply.error) appendLog('SYS-ERR', reply.error, '#f00');
+    });
+    return btn;
+}
+
+// ─── Command channel ─────────────────────────────────────────────────────────
+// Commands go over the /ws socket; each reply carries the id of its command.
+const UI_TOPICS = ['node_update', 'terminal_log', 'meta', 'vault'];
+const pendingCommands = new Map();
+let commandSeq = 0;
+
+function sendCommand(op, body = {}, timeoutMs = 15000) {
+    return new Promise((resolve, reject) => {
+        if (!ws || ws.readyState !== WebSocket.OPEN) return reject(new Error('WebSocket not connected'));
+        const id = ++commandSeq;
+        const timer = setTimeout(() => {
+            pendingCommands.delete(id);
+            reject(new Error(`${op} timed out`));
+        }, timeoutMs);
+        pendingCommands.set(id, (reply) => { clearTimeout(timer); resolve(reply); });
+        ws.send(JSON.stringify({ op, id, ...body }));
+    });
+}
+
 function connect() {
     ws = new WebSocket(`ws://${window.location.host}/ws`);
-    ws.onopen = () => { appendLog('SYSTEM', 'Connected to the CARNIVAL GROUNDS.', '#0f0'); };
+    ws.onopen = () => {
+        appendLog('SYSTEM', 'Connected to the CARNIVAL GROUNDS.', '#0f0');
+        sendCommand('subscribe', { topics: UI_TOPICS }).catch(() => {});
+    };
 
     ws.onmessage = (event) => {
         const data = JSON.parse(event.data);
+        if (data.type === 'reply') {
+            const done = pendingCommands.get(data.id);
+            if (done) { pendingCommands.delete(data.id); done(data); }
+            return;
+        }
         if (data.type === 'node_update') { updateNodes(data.nodes); }
         if (data.type === 'terminal_log') {
             appendLog(data.node_id, data.log);
@@ -105,40 +149,68 @@ function connect() {
 connect();
 
 // ─── Vault Functions ──────────────────────────────────────────────────────────
-async function fetchVault() {
+// The vault is paged server-side; "LOAD MORE" fetches the next page via its cursor.
+const VAULT_PAGE_SIZE = 200;
+let vaultCursor = null;
+let vaultShown = 0;
+
+function renderVaultItem(fileList, f) {
+    const li = document.createElement('li');
+    li.style.cssText = 'display:flex;justify-content:space-between;align-items:center;gap:8px;padding:4px 0;border-bottom:1px solid rgba(255,255,255,0.05);font-size:0.78rem;';
+    if (f.error) {
+        li.innerHTML = `<span style="opacity:0.4;">[${f.node_id}] ERROR: ${f.error}</span>`;
+    } else {
+        li.innerHTML = `
+            <span style="color:var(--milenko-purple);font-size:0.7rem;white-space:nowrap;">[${f.node_id}]</span>
+            <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;" title="${f.filename}">${f.filename}</span>
+            <button onclick="analyzeVaultFile('${f.node_id}','${f.filename}')" style="background:transparent;border:1px solid var(--riddle-green);color:var(--riddle-green);font-family:'Share Tech Mono',monospace;font-size:0.7rem;padding:2px 6px;cursor:pointer;">INGEST</button>
+            <button onclick="deleteVaultFile('${f.node_id}','${f.filename}')" style="background:transparent;border:1px solid var(--wraith-red);color:var(--wraith-red);font-family:'Share Tech Mono',monospace;font-size:0.7rem;padding:2px 6px;cursor:pointer;">DEL</button>
+        `;
+    }
+    fileList.appendChild(li);
+}
+
+async function fetchVault(append = false) {
     const fileList = document.getElementById('file-list');
     const learningOutput = document.getElementById('learning-output');
     if (!fileList) return;
-    fileList.innerHTML = '<li style="opacity:0.5;">> Scanning wagons...</li>';
+    if (!append) {
+        vaultCursor = null;
+        vaultShown = 0;
+        fileList.innerHTML = '<li style="opacity:0.5;">> Scanning wagons...</li>';
+    }
     try {
-        const res = await fetch('/api/vault');
+        const params = new URLSearchParams({ limit: VAULT_PAGE_SIZE });
+        if (append && vaultCursor) params.set('cursor', vaultCursor);
+        const res = await fetch(`/api/vault?${params}`);
         const data = await res.json();
+        if (data.error) throw new Error(data.error);
         const files = data.vault || [];
-        fileList.innerHTML = '';
-        if (files.length === 0) {
-            fileList.innerHTML = '<li style="opacity:0.5;">> No completions found in any Wagon.</li>';
+        document.getElementById('vault-more')?.remove();
+        if (!append) {
+            fileList.innerHTML = '';
+            (data.errors || []).forEach(f => renderVaultItem(fileList, f));
+        }
+        if (!append && files.length === 0) {
+            fileList.innerHTML += '<li style="opacity:0.5;">> No completions found in any Wagon.</li>';
             return;
         }
-        files.forEach(f => {
-            const li = document.createElement('li');
-            li.style.cssText = 'display:flex;justify-content:space-between;align-items:center;gap:8px;padding:4px 0;border-bottom:1px solid rgba(255,255,255,0.05);font-size:0.78rem;';
-            if (f.error) {
-                li.innerHTML = `<span style="opacity:0.4;">[${f.node_id}] ERROR: ${f.error}</span>`;
-            } else {
-                li.innerHTML = `
-                    <span style="color:var(--milenko-purple);font-size:0.7rem;white-space:nowrap;">[${f.node_id}]</span>
-                    <span style="flex:1;overflow:hidden;text-overflow:ellipsis;white-space:nowrap;" title="${f.filename}">${f.filename}</span>
-                    <button onclick="analyzeVaultFile('${f.node_id}','${f.filename}')" style="background:transparent;border:1px solid var(--riddle-green);color:var(--riddle-green);font-family:'Share Tech Mono',monospace;font-size:0.7rem;padding:2px 6px;cursor:pointer;">INGEST</button>
-                    <button onclick="deleteVaultFile('${f.node_id}','${f.filename}')" style="background:transparent;border:1px solid var(--wraith-red);color:var(--wraith-red);font-family:'Share Tech Mono',monospace;font-size:0.7rem;padding:2px 6px;cursor:pointer;">DEL</button>
-                `;
-            }
-            fileList.appendChild(li);
-        });
-        if (learningOutput) {
+        files.forEach(f => renderVaultItem(fileList, f));
+        vaultShown += files.length;
+        vaultCursor = data.next_cursor;
+        if (vaultCursor) {
+            const more = document.createElement('li');
+            more.id = 'vault-more';
+            more.style.cssText = 'text-align:center;padding:6px 0;cursor:pointer;color:var(--riddle-green);font-size:0.75rem;';
+            more.textContent = `[ LOAD MORE — ${vaultShown}/${data.total} shown ]`;
+            more.onclick = () => fetchVault(true);
+            fileList.appendChild(more);
+        }
+        if (learningOutput && !append) {
             const line = document.createElement('div');
             line.className = 'log-line';
             line.style.color = 'var(--riddle-green)';
-            line.textContent = `> Vault refreshed. ${files.length} completion(s) found across ${new Set(files.map(f => f.node_id)).size} wagon(s).`;
+            line.textContent = `> Vault refreshed. ${data.total} completion(s) found across ${new Set(files.map(f => f.node_id)).size} wagon(s).`;
             learningOutput.appendChild(line);
             learningOutput.scrollTop = learningOutput.scrollHeight;
         }
@@ -237,7 +309,7 @@ async function improveAllWagons() {
 // Wire up Vault buttons by ID (DOMContentLoaded fires after scripts load)
 document.addEventListener('DOMContentLoaded', () => {
     const refreshBtn = document.getElementById('vault-refresh-btn');
-    if (refreshBtn) refreshBtn.onclick = fetchVault;
+    if (refreshBtn) refreshBtn.onclick = () => fetchVault();
 
     const improveBtn = document.getElementById('improve-all-btn');
     if (improveBtn) improveBtn.onclick = improveAllWagons;
@@ -307,12 +379,18 @@ async function executeGlobalEvent(val) {
     setCardState('tactician', 'WAITING...', 'idle');
 
     try {
-        const res = await fetch('/api/swarm/dispatch', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
-        });
-        const data = await res.json();
+        let data;
+        if (ws && ws.readyState === WebSocket.OPEN) {
+            data = await sendCommand('dispatch', payload);
+        } else {
+            // Socket down (reconnecting) — fall back to REST
+            const res = await fetch('/api/swarm/dispatch', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload)
+            });
+            data = await res.json();
+        }
         if (data.error) appendLog('SYS-ERR', data.error, '#f00');
         else appendLog('ROUTER', `Signal locked. Relaying directly to ${data.target}...`, 'cyan');
     } catch (err) {
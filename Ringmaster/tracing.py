@@ -0,0 +1,237 @@
+"""
+Ringmaster Tracing — trace IDs, deadlines and a local span store.
+
+Every hub request runs inside a TraceContext (trace ID + absolute deadline).
+Outgoing Wagon calls forward both via headers so a slow dispatch can be broken
+down into hub routing, network, RoundTable debate and provider time.
+"""
+
+import contextvars
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+TRACE_HEADER = "X-Trace-Id"
+PARENT_HEADER = "X-Parent-Span-Id"
+# Remaining budget in milliseconds. Relative, so clock skew between LXC hosts doesn't matter.
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+DEFAULT_BUDGET = float(os.environ.get("RINGMASTER_DEFAULT_DEADLINE", "300"))
+MAX_TRACES = int(os.environ.get("RINGMASTER_MAX_TRACES", "500"))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is about to start after its deadline has already passed."""
+
+
+@dataclass
+class TraceContext:
+    trace_id: str
+    deadline: float  # absolute time.time()
+    span_id: Optional[str] = None
+
+    def remaining(self) -> float:
+        return self.deadline - time.time()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float
+    end: Optional[float] = None
+    status: str = "ok"
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        end = self.end if self.end is not None else time.time()
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((end - self.start) * 1000, 2),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class TraceStore:
+    """Bounded in-memory store of recent traces, oldest evicted first."""
+
+    def __init__(self, max_traces: int = MAX_TRACES):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+
+    def record(self, span: Span):
+        spans = self._traces.get(span.trace_id)
+        if spans is None:
+            spans = self._traces[span.trace_id] = []
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        spans.append(span)
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        out = []
+        for trace_id in reversed(self._traces):
+            spans = self._traces[trace_id]
+            start = min(s.start for s in spans)
+            end = max((s.end or s.start) for s in spans)
+            root = next((s for s in spans if s.parent_id is None), spans[0])
+            out.append({
+                "trace_id": trace_id,
+                "name": root.name,
+                "start": start,
+                "duration_ms": round((end - start) * 1000, 2),
+                "spans": len(spans),
+            })
+            if len(out) >= limit:
+                break
+        return out
+
+    def waterfall(self, trace_id: str) -> Optional[dict]:
+        """Return the spans of a trace ordered by start time, with offsets and nesting depth."""
+        spans = self._traces.get(trace_id)
+        if not spans:
+            return None
+        by_id = {s.span_id: s for s in spans}
+
+        def depth(s: Span) -> int:
+            d = 0
+            while s.parent_id and s.parent_id in by_id and d < 64:
+                s = by_id[s.parent_id]
+                d += 1
+            return d
+
+        t0 = min(s.start for s in spans)
+        t1 = max((s.end or s.start) for s in spans)
+        rows = []
+        for s in sorted(spans, key=lambda s: (s.start, depth(s))):
+            row = s.to_dict()
+            row["offset_ms"] = round((s.start - t0) * 1000, 2)
+            row["depth"] = depth(s)
+            rows.append(row)
+        return {"trace_id": trace_id, "duration_ms": round((t1 - t0) * 1000, 2), "spans": rows}
+
+
+store = TraceStore()
+
+_current: contextvars.ContextVar[Optional[TraceContext]] = contextvars.ContextVar("ringmaster_trace", default=None)
+
+
+def new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def context_from_headers(headers) -> TraceContext:
+    """Build a TraceContext from inbound request headers, starting a new trace if none is present."""
+    trace_id = headers.get(TRACE_HEADER) or uuid.uuid4().hex
+    budget = DEFAULT_BUDGET
+    raw = headers.get(DEADLINE_HEADER)
+    if raw is not None:
+        try:
+            ms = float(raw)
+        except ValueError:
+            ms = None
+        # "nan"/"inf" parse as floats but can never expire and break outgoing_headers()
+        if ms is not None and math.isfinite(ms) and ms >= 0:
+            budget = ms / 1000.0
+    return TraceContext(trace_id=trace_id, deadline=time.time() + budget, span_id=headers.get(PARENT_HEADER))
+
+
+def current() -> Optional[TraceContext]:
+    return _current.get()
+
+
+def activate(ctx: TraceContext):
+    return _current.set(ctx)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a child span of the active trace. A no-op outside a traced request."""
+    ctx = _current.get()
+    if ctx is None:
+        yield None
+        return
+    s = Span(trace_id=ctx.trace_id, span_id=new_span_id(), parent_id=ctx.span_id,
+             name=name, start=time.time(), attrs=dict(attrs))
+    token = _current.set(TraceContext(trace_id=ctx.trace_id, deadline=ctx.deadline, span_id=s.span_id))
+    try:
+        yield s
+    except DeadlineExceeded:
+        s.status = "dropped"
+        raise
+    except BaseException as e:
+        s.status = "error"
+        s.attrs["error"] = str(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end = time.time()
+        store.record(s)
+
+
+def check_deadline(what: str = "work"):
+    """Raise DeadlineExceeded if the active trace has already run out of budget."""
+    ctx = _current.get()
+    if ctx is not None and ctx.expired():
+        raise DeadlineExceeded(f"Deadline exceeded {-ctx.remaining():.2f}s ago — dropping {what}.")
+
+
+def outgoing_headers() -> Dict[str, str]:
+    """Headers that forward the active trace and remaining deadline to a Wagon."""
+    ctx = _current.get()
+    if ctx is None:
+        return {}
+    headers = {TRACE_HEADER: ctx.trace_id, DEADLINE_HEADER: str(max(0, int(ctx.remaining() * 1000)))}
+    if ctx.span_id:
+        headers[PARENT_HEADER] = ctx.span_id
+    return headers
+
+
+def timeout_for(default: float) -> float:
+    """Clamp a client timeout to the remaining deadline of the active trace."""
+    ctx = _current.get()
+    if ctx is None:
+        return default
+    return max(0.001, min(default, ctx.remaining()))
+
+
+def record_server_timing(parent: Optional[Span], header: Optional[str]):
+    """
+    Turn a Wagon's Server-Timing header (e.g. "debate;dur=812.4, provider;dur=640")
+    into child spans of `parent`. Server-Timing carries no offsets, so the phases
+    are laid out back-to-back from the start of the parent span.
+    """
+    if parent is None or not header:
+        return
+    cursor = parent.start
+    for part in header.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        name, dur = fields[0], None
+        for f in fields[1:]:
+            if f.startswith("dur="):
+                try:
+                    dur = float(f[4:]) / 1000.0
+                except ValueError:
+                    pass
+        if not name or dur is None:
+            continue
+        store.record(Span(trace_id=parent.trace_id, span_id=new_span_id(), parent_id=parent.span_id,
+                          name=f"wagon.{name}", start=cursor, end=cursor + dur))
+        cursor += dur
@@ -0,0 +1,416 @@
+"""
+Ringmaster Traffic Record / Replay
+==================================
+Captures real hub traffic to a compact JSONL log (gzip when the path ends in .gz)
+and replays it against a hub build with fake Wagons answering from the recorded
+responses. Two replay reports can be compared for latency and throughput.
+
+Recording (set before starting the hub):
+    RINGMASTER_RECORD=state/traffic.jsonl.gz python main.py
+
+Replay / compare:
+    python traffic.py replay state/traffic.jsonl.gz --hub http://localhost:8000 --speed 4 --out run_a.json
+    python traffic.py compare run_a.json run_b.json
+
+Log events (one JSON object per line, short keys to keep the log small):
+    {"k": "req",   "t": 1.25, "m": "POST", "p": "/api/swarm/dispatch", "q": "", "r": "/api/swarm/dispatch", "b": "...", "s": 200, "ms": 3.1}
+    {"k": "wagon", "t": 1.26, "m": "GET", "h": "10.0.0.5:8080", "p": "/api/completions", "s": 200, "b": "...", "ms": 12.4}
+    {"k": "ws_open" | "ws_in" | "ws_close", "t": 2.0, "c": 3, "d": "..."}
+
+Every event is flushed as it is written, so a hub crash loses at most the line in
+flight; a gzip log cut short that way still loads. Wagon response bodies above
+RINGMASTER_RECORD_MAX_BODY bytes (default 64 KiB) are truncated, with the original
+length kept in "bn".
+"""
+
+import asyncio
+import gzip
+import itertools
+import json
+import os
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+RECORD_MAX_BODY = int(os.environ.get("RINGMASTER_RECORD_MAX_BODY", str(64 * 1024)))
+
+
+def _open_log(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def load_events(path: str) -> List[dict]:
+    """Read a log, dropping the torn last line (and missing gzip trailer) of a recording cut short by a crash."""
+    events = []
+    with _open_log(path, "r") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        break
+        except EOFError:
+            pass
+    return events
+
+
+# ─── Recording ────────────────────────────────────────────────────────────────
+
+class TrafficRecorder:
+    """Appends hub traffic events to a JSONL log, timestamped relative to recorder start."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = _open_log(path, "a")
+        self._t0 = time.monotonic()
+        self._ws_ids = itertools.count(1)
+
+    @classmethod
+    def from_env(cls) -> Optional["TrafficRecorder"]:
+        path = os.environ.get("RINGMASTER_RECORD")
+        return cls(path) if path else None
+
+    def _write(self, event: dict):
+        event["t"] = round(time.monotonic() - self._t0, 4)
+        self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def wagon(self, method: str, url: str, status: int, body: str, elapsed: float):
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        event = {"k": "wagon", "m": method, "h": parts.netloc, "p": path,
+                 "s": status, "b": body, "ms": round(elapsed * 1000, 2)}
+        if len(body) > RECORD_MAX_BODY:
+            event["b"], event["bn"] = body[:RECORD_MAX_BODY], len(body)
+        self._write(event)
+
+    def close(self):
+        self._file.close()
+
+
+class RecordingMiddleware:
+    """ASGI middleware that records /api requests and /ws client messages."""
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            return await self._record_ws(scope, receive, send)
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        body = bytearray()
+        status = 0
+        start = time.monotonic()
+
+        async def recv():
+            message = await receive()
+            if message["type"] == "http.request":
+                body.extend(message.get("body", b""))
+            return message
+
+        async def snd(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, recv, snd)
+        finally:
+            path = scope["path"]
+            route = path
+            for name, value in (scope.get("path_params") or {}).items():
+                route = route.replace(f"/{value}", f"/{{{name}}}", 1)
+            self.recorder._write({
+                "k": "req", "m": scope["method"], "p": path,
+                "q": scope.get("query_string", b"").decode("latin-1"), "r": route,
+                "b": body.decode("utf-8", "replace"), "s": status,
+                "ms": round((time.monotonic() - start) * 1000, 2),
+            })
+
+    async def _record_ws(self, scope, receive, send):
+        conn = next(self.recorder._ws_ids)
+
+        async def recv():
+            message = await receive()
+            if message["type"] == "websocket.connect":
+                self.recorder._write({"k": "ws_open", "c": conn, "p": scope["path"],
+                                      "q": scope.get("query_string", b"").decode("latin-1")})
+            elif message["type"] == "websocket.receive" and message.get("text") is not None:
+                self.recorder._write({"k": "ws_in", "c": conn, "d": message["text"]})
+            elif message["type"] == "websocket.disconnect":
+                self.recorder._write({"k": "ws_close", "c": conn})
+            return message
+
+        await self.app(scope, recv, send)
+
+
+# ─── Fake Wagons ──────────────────────────────────────────────────────────────
+
+class FakeWagon:
+    """ASGI app answering Wagon requests from recorded responses, in recorded order (cycling)."""
+
+    def __init__(self, responses: Dict[tuple, List[dict]], speed: float, emulate_latency: bool):
+        self.responses = {key: deque(items) for key, items in responses.items()}
+        self.speed = speed
+        self.emulate_latency = emulate_latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        path = scope["path"]
+        if scope.get("query_string"):
+            path += "?" + scope["query_string"].decode("latin-1")
+        queue = self.responses.get((scope["method"], path))
+        if not queue:
+            status, body, ms = 404, json.dumps({"error": "not recorded"}), 0.0
+        else:
+            item = queue[0]
+            queue.rotate(-1)
+            status, body, ms = item["s"], item["b"], item["ms"]
+        if self.emulate_latency and ms:
+            await asyncio.sleep(ms / 1000.0 / self.speed)
+        payload = body.encode("utf-8")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+
+async def _start_fake_wagons(events: List[dict], speed: float, port_base: int, emulate_latency: bool):
+    import uvicorn
+
+    by_host: Dict[str, Dict[tuple, List[dict]]] = defaultdict(lambda: defaultdict(list))
+    for e in events:
+        if e["k"] == "wagon":
+            by_host[e["h"]][(e["m"], e["p"])].append(e)
+    # Registered Wagons with no recorded responses still need an address to be probed at.
+    for e in events:
+        if e["k"] == "req" and e["p"] == "/api/nodes/register":
+            try:
+                body = json.loads(e["b"])
+                by_host.setdefault(f"{body['ip']}:{body['port']}", defaultdict(list))
+            except (ValueError, KeyError):
+                pass
+
+    servers, tasks, mapping = [], [], {}
+    for i, host in enumerate(sorted(by_host)):
+        port = port_base + i
+        config = uvicorn.Config(FakeWagon(by_host[host], speed, emulate_latency),
+                                host="127.0.0.1", port=port, log_level="warning")
+        server = uvicorn.Server(config)
+        server.install_signal_handlers = lambda: None
+        tasks.append(asyncio.create_task(server.serve()))
+        servers.append(server)
+        mapping[host] = port
+    while not all(s.started for s in servers):
+        await asyncio.sleep(0.05)
+    return servers, tasks, mapping
+
+
+# ─── Replay ───────────────────────────────────────────────────────────────────
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return round(ordered[idx], 2)
+
+
+def _summarize(latencies: List[float], errors: int) -> dict:
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+async def replay(log_path: str, hub: str, speed: float = 1.0, port_base: int = 19000,
+                 emulate_latency: bool = True) -> dict:
+    """Replay a recorded log against `hub` and return a latency/throughput report."""
+    import httpx
+    import websockets
+
+    events = load_events(log_path)
+    servers, server_tasks, mapping = await _start_fake_wagons(events, speed, port_base, emulate_latency)
+    hub = hub.rstrip("/")
+    ws_base = "ws" + hub[len("http"):] if hub.startswith("http") else hub
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    ws_queues: Dict[int, asyncio.Queue] = {}
+    ws_stats = {"sessions": 0, "messages_sent": 0, "messages_received": 0, "connect_ms": []}
+
+    def rewrite_body(e: dict) -> str:
+        if e["p"] != "/api/nodes/register":
+            return e["b"]
+        body = json.loads(e["b"])
+        port = mapping.get(f"{body['ip']}:{body['port']}")
+        if port is not None:
+            body["ip"], body["port"] = "127.0.0.1", port
+        return json.dumps(body)
+
+    async def fire(client, e):
+        key = f"{e['m']} {e.get('r', e['p'])}"
+        url = hub + e["p"] + (f"?{e['q']}" if e.get("q") else "")
+        start = time.monotonic()
+        try:
+            res = await client.request(e["m"], url, content=rewrite_body(e) or None,
+                                       headers={"Content-Type": "application/json"})
+            latencies[key].append((time.monotonic() - start) * 1000)
+            if res.status_code >= 500 or res.status_code != e.get("s", res.status_code):
+                errors[key] += 1
+        except httpx.HTTPError:
+            latencies[key].append((time.monotonic() - start) * 1000)
+            errors[key] += 1
+
+    async def ws_session(e: dict, queue: asyncio.Queue):
+        url = ws_base + e.get("p", "/ws") + (f"?{e['q']}" if e.get("q") else "")
+        start = time.monotonic()
+        try:
+            async with websockets.connect(url) as sock:
+                ws_stats["sessions"] += 1
+                ws_stats["connect_ms"].append((time.monotonic() - start) * 1000)
+
+                async def drain():
+                    async for _ in sock:
+                        ws_stats["messages_received"] += 1
+
+                reader = asyncio.create_task(drain())
+                while True:
+                    data = await queue.get()
+                    if data is None:
+                        break
+                    await sock.send(data)
+                    ws_stats["messages_sent"] += 1
+                await sock.close()
+                await reader
+        except Exception:
+            errors["WS /ws"] += 1
+
+    tasks = []
+    t_start = time.monotonic()
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for e in events:
+            if e["k"] == "wagon":
+                continue
+            delay = e["t"] / speed - (time.monotonic() - t_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if e["k"] == "req":
+                tasks.append(asyncio.create_task(fire(client, e)))
+            elif e["k"] == "ws_open":
+                ws_queues[e["c"]] = asyncio.Queue()
+                tasks.append(asyncio.create_task(ws_session(e, ws_queues[e["c"]])))
+            elif e["k"] == "ws_in" and e["c"] in ws_queues:
+                ws_queues[e["c"]].put_nowait(e["d"])
+            elif e["k"] == "ws_close" and e["c"] in ws_queues:
+                ws_queues.pop(e["c"]).put_nowait(None)
+        for queue in ws_queues.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*tasks)
+    wall = time.monotonic() - t_start
+
+    # Let fire-and-forget Wagon calls made by the hub finish before the fake Wagons go away.
+    for server in servers:
+        server.should_exit = True
+    await asyncio.gather(*server_tasks)
+
+    all_latencies = [ms for values in latencies.values() for ms in values]
+    connect_ms = ws_stats.pop("connect_ms")
+    return {
+        "log": log_path,
+        "hub": hub,
+        "speed": speed,
+        "wall_s": round(wall, 3),
+        "requests": len(all_latencies),
+        "throughput_rps": round(len(all_latencies) / wall, 2) if wall else 0.0,
+        "overall": _summarize(all_latencies, sum(errors.values())),
+        "routes": {key: _summarize(values, errors.get(key, 0)) for key, values in sorted(latencies.items())},
+        "websocket": {**ws_stats, "connect_p50_ms": _percentile(connect_ms, 50), "errors": errors.get("WS /ws", 0)},
+    }
+
+
+def compare(a: dict, b: dict) -> str:
+    """Render a side-by-side latency/throughput comparison of two replay reports."""
+
+    def delta(x: float, y: float) -> str:
+        if not x:
+            return "   n/a"
+        return f"{100.0 * (y - x) / x:+6.1f}%"
+
+    lines = [
+        f"A: {a['log']} @ {a['hub']} (x{a['speed']})",
+        f"B: {b['log']} @ {b['hub']} (x{b['speed']})",
+        "",
+        f"Throughput: {a['throughput_rps']:.2f} → {b['throughput_rps']:.2f} req/s ({delta(a['throughput_rps'], b['throughput_rps'])})",
+        f"Overall p50: {a['overall']['p50_ms']} → {b['overall']['p50_ms']} ms ({delta(a['overall']['p50_ms'], b['overall']['p50_ms'])})",
+        f"Overall p95: {a['overall']['p95_ms']} → {b['overall']['p95_ms']} ms ({delta(a['overall']['p95_ms'], b['overall']['p95_ms'])})",
+        "",
+        f"{'ROUTE':<44} {'N':>5} {'p50 A':>9} {'p50 B':>9} {'Δp50':>8} {'p95 A':>9} {'p95 B':>9} {'Δp95':>8} {'ERR A/B':>8}",
+    ]
+    for route in sorted(set(a["routes"]) | set(b["routes"])):
+        ra = a["routes"].get(route, _summarize([], 0))
+        rb = b["routes"].get(route, _summarize([], 0))
+        lines.append(
+            f"{route[:44]:<44} {max(ra['count'], rb['count']):>5} "
+            f"{ra['p50_ms']:>9} {rb['p50_ms']:>9} {delta(ra['p50_ms'], rb['p50_ms']):>8} "
+            f"{ra['p95_ms']:>9} {rb['p95_ms']:>9} {delta(ra['p95_ms'], rb['p95_ms']):>8} "
+            f"{ra['errors']:>3}/{rb['errors']:<4}"
+        )
+    return "\n".join(lines)
+
+
+# ─── CLI Entry Point ───────────────────────────────────────────────────────────
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ringmaster traffic replay and comparison")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rp = sub.add_parser("replay", help="Replay a recorded log against a running hub")
+    rp.add_argument("log", help="Recorded traffic log (.jsonl or .jsonl.gz)")
+    rp.add_argument("--hub", default="http://localhost:8000", help="Hub base URL")
+    rp.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (1 = real time)")
+    rp.add_argument("--port-base", type=int, default=19000, help="First local port for fake Wagons")
+    rp.add_argument("--no-wagon-latency", action="store_true", help="Answer instantly instead of emulating recorded Wagon latency")
+    rp.add_argument("--out", help="Write the JSON report to this path")
+
+    cp = sub.add_parser("compare", help="Compare two replay reports")
+    cp.add_argument("a")
+    cp.add_argument("b")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        report = asyncio.run(replay(args.log, args.hub, args.speed, args.port_base, not args.no_wagon_latency))
+        text = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+        print(text)
+    else:
+        with open(args.a, encoding="utf-8") as fa, open(args.b, encoding="utf-8") as fb:
+            print(compare(json.load(fa), json.load(fb)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Ringmaster Vault Index — incremental full-text search over Wagon completions.
+
+Completion file contents are kept in a SQLite FTS5 table. The hub fills it
+from background crawls of each Wagon's /api/completions. Only files whose
+size/mtime changed are downloaded, and a file whose SHA-256 is unchanged is
+not re-indexed. Files too large to index are recorded as skipped, so they are
+reconsidered only when their size/mtime changes.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    node_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    sha TEXT,
+    indexed_at REAL,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (node_id, filename)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(filename, content);
+"""
+
+
+def to_match_query(q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word must match, a trailing * keeps prefix search."""
+    terms = []
+    for word, star in re.findall(r"(\w+)(\*?)", q):
+        terms.append(f'"{word}"{star}')
+    return " ".join(terms) or None
+
+
+class VaultIndex:
+    """SQLite FTS5 index of completion files, keyed by (node_id, filename)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+        if "skipped" not in columns:  # Index created before skipped files were recorded
+            self._db.execute("ALTER TABLE files ADD COLUMN skipped INTEGER NOT NULL DEFAULT 0")
+            self._db.commit()
+        self._lock = threading.Lock()
+
+    def known(self, node_id: str) -> Dict[str, Tuple[Optional[int], Optional[float]]]:
+        """filename → (size, mtime) for everything indexed or skipped from a node."""
+        with self._lock:
+            rows = self._db.execute("SELECT filename, size, mtime FROM files WHERE node_id = ?", (node_id,)).fetchall()
+        return {name: (size, mtime) for name, size, mtime in rows}
+
+    def plan(self, node_id: str, entries: List[dict]) -> Tuple[List[dict], List[str]]:
+        """
+        Compare a Wagon listing against the index.
+
+        Args:
+            entries: [{"name", "size", "mtime"}] — size/mtime are None for Wagons without listing metadata.
+
+        Returns:
+            (entries to (re)fetch, filenames that disappeared from the Wagon)
+        """
+        known = self.known(node_id)
+        fetch = []
+        for e in entries:
+            prev = known.get(e["name"])
+            if prev is None:
+                fetch.append(e)
+            elif e.get("size") is not None and prev != (e.get("size"), e.get("mtime")):
+                fetch.append(e)
+        listed = {e["name"] for e in entries}
+        return fetch, [name for name in known if name not in listed]
+
+    def upsert(self, node_id: str, filename: str, size: Optional[int], mtime: Optional[float], content: str) -> bool:
+        """Index one file. Returns False when the content hash is unchanged and only metadata was updated."""
+        sha = hashlib.sha256(content.encode("utf-8", "replace")).hexdigest()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id, sha FROM files WHERE node_id = ? AND filename = ?",
+                                   (node_id, filename)).fetchone()
+            if row is not None and row[1] == sha:
+                self._db.execute("UPDATE files SET size = ?, mtime = ?, indexed_at = ?, skipped = 0 WHERE id = ?",
+                                 (size, mtime, time.time(), row[0]))
+                return False
+            if row is None:
+                cur = self._db.execute(
+                    "INSERT INTO files (node_id, filename, size, mtime, sha, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (node_id, filename, size, mtime, sha, time.time()))
+                doc_id = cur.lastrowid
+            else:
+                doc_id = row[0]
+                self._db.execute("UPDATE files SET size = ?, mtime = ?, sha = ?, indexed_at = ?, skipped = 0 WHERE id = ?",
+                                 (size, mtime, sha, time.time(), doc_id))
+                self._db.execute("DELETE FROM docs WHERE rowid = ?", (doc_id,))
+            self._db.execute("INSERT INTO docs (rowid, filename, content) VALUES (?, ?, ?)", (doc_id, filename, content))
+            return True
+
+    def skip(self, node_id: str, filename: str, size: Optional[int], mtime: Optional[float]):
+        """Record a file that is not indexed (e.g. too large) so it is re-planned only when its size/mtime changes."""
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM files WHERE node_id = ? AND filename = ?",
+                                   (node_id, filename)).fetchone()
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO files (node_id, filename, size, mtime, sha, indexed_at, skipped) VALUES (?, ?, ?, ?, NULL, ?, 1)",
+                    (node_id, filename, size, mtime, time.time()))
+            else:
+                # Drop stale content from before the file outgrew the limit
+                self._db.execute("UPDATE files SET size = ?, mtime = ?, sha = NULL, indexed_at = ?, skipped = 1 WHERE id = ?",
+                                 (size, mtime, time.time(), row[0]))
+                self._db.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+
+    def remove(self, node_id: str, filenames: List[str]):
+        if not filenames:
+            return
+        with self._lock, self._db:
+            for filename in filenames:
+                row = self._db.execute("SELECT id FROM files WHERE node_id = ? AND filename = ?",
+                                       (node_id, filename)).fetchone()
+                if row is not None:
+                    self._db.execute("DELETE FROM docs WHERE rowid = ?", (row[0],))
+                    self._db.execute("DELETE FROM files WHERE id = ?", (row[0],))
+
+    def search(self, q: str, limit: int = 20, node_id: Optional[str] = None) -> List[dict]:
+        """BM25-ranked matches (filename hits weigh 5x) with highlighted snippets."""
+        match = to_match_query(q)
+        if match is None:
+            return []
+        sql = (
+            "SELECT f.node_id, f.filename, f.size, f.mtime, "
+            "snippet(docs, 1, '[', ']', '…', 16), bm25(docs, 5.0, 1.0) AS score "
+            "FROM docs JOIN files f ON f.id = docs.rowid WHERE docs MATCH ?"
+        )
+        params: list = [match]
+        if node_id:
+            sql += " AND f.node_id = ?"
+            params.append(node_id)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            {"node_id": n, "filename": f, "size": size, "mtime": mtime, "snippet": snip, "score": round(-score, 4)}
+            for n, f, size, mtime, snip, score in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, nodes, skipped = self._db.execute(
+                "SELECT COUNT(*) - SUM(skipped), COUNT(DISTINCT node_id), SUM(skipped) FROM files").fetchone()
+        return {"files": files or 0, "nodes": nodes, "skipped": skipped or 0}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
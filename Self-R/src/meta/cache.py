@@ -0,0 +1,235 @@
+"""
+Self-R Meta Layer — Content-Addressed Analysis Cache
+=====================================================
+Stores analysis results on disk keyed by (content checksum, analyzer version), so
+unchanged content is never analyzed twice — across sessions, and across Wagons
+that point at the same cache directory.
+
+AnalysisCache: static analysis findings. Entries are small JSON files in a
+two-level sharded tree (<root>/<namespace>/<ab>/<key>.json). Writes are atomic, so
+several processes may share a directory. A hit refreshes the entry's mtime, and
+once the tree grows past `max_bytes` the least recently used entries are evicted.
+
+LLMResponseCache: LLM audit and rewrite responses in SQLite, keyed by a hash of
+(kind, prompt version, provider, issue, content). Entries expire after a TTL, the
+store is size-bounded with LRU eviction, and hit/miss counts persist per kind.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def content_checksum(content: str) -> str:
+    """The checksum SourceModule uses: first 12 hex digits of the content's SHA-256."""
+    return hashlib.sha256(content.encode()).hexdigest()[:12]
+
+
+class AnalysisCache:
+    """
+    Size-bounded, checksum-keyed result cache shared between processes.
+
+    Namespaces keep unrelated results apart; "static" holds StaticAnalyzer findings.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 64 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None  # Bytes on disk, measured lazily; other writers are seen at eviction time
+
+    def _path(self, namespace: str, checksum: str, version: str) -> Path:
+        key = hashlib.sha256(f"{checksum}:{version}".encode()).hexdigest()[:32]
+        return self.root / namespace / key[:2] / f"{key}.json"
+
+    def get(self, namespace: str, checksum: str, version: str):
+        """Return the cached value, or None on a miss."""
+        path = self._path(namespace, checksum, version)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+        if entry.get("checksum") != checksum or entry.get("version") != version:
+            self.misses += 1  # Key prefix collision
+            return None
+        try:
+            os.utime(path)  # LRU: a hit makes the entry recent
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["value"]
+
+    def put(self, namespace: str, checksum: str, version: str, value):
+        """Store a JSON-serializable value, then evict if the cache is over budget."""
+        path = self._path(namespace, checksum, version)
+        data = json.dumps({"checksum": checksum, "version": version, "value": value}).encode("utf-8")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            return
+        if self._size is None:
+            self._size = self._measure()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every entry under the root."""
+        entries = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:  # Evicted by another process
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _measure(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache is at 90% of its budget."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logger.info(f"Analysis cache: evicted {removed} entries ({total} bytes kept).")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._measure(), "max_bytes": self.max_bytes}
+
+
+LLM_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+CREATE TABLE IF NOT EXISTS stats (
+    kind TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class LLMResponseCache:
+    """
+    SQLite store of LLM responses ("audit", "rewrite"), safe to share between threads
+    and processes.
+
+    Responses older than `ttl` seconds count as misses and are purged. When the
+    stored values exceed `max_bytes`, the least recently read entries are evicted
+    down to 90% of the budget.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(LLM_SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, version: str, provider: str, issue: str, content: str) -> str:
+        h = hashlib.sha256()
+        for part in (kind, version, provider, issue):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        h.update(content.encode("utf-8"))
+        return h.hexdigest()
+
+    def _count(self, kind: str, hit: bool):
+        column = "hits" if hit else "misses"
+        self._db.execute(f"INSERT INTO stats (kind, {column}) VALUES (?, 1) "
+                         f"ON CONFLICT (kind) DO UPDATE SET {column} = {column} + 1", (kind,))
+
+    def get(self, kind: str, key: str):
+        """Return the cached response, or None on a miss (absent or expired)."""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            self._count(kind, row is not None)
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, kind: str, key: str, value):
+        """Store a JSON-serializable response, then purge expired entries and evict if over budget."""
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, data, len(data), now, now))
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                evicted = 0
+                for old_key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+                    if total <= target:
+                        break
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= size
+                    evicted += 1
+                logger.info(f"LLM response cache: evicted {evicted} entries ({total} bytes kept).")
+
+    def stats(self) -> dict:
+        """Per-kind hits, misses and hit rate (persisted across runs), plus entry count and size."""
+        with self._lock:
+            rows = self._db.execute("SELECT kind, hits, misses FROM stats").fetchall()
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        kinds = {kind: {"hits": hits, "misses": misses, "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0}
+                 for kind, hits, misses in rows}
+        return {"kinds": kinds, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
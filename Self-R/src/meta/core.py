@@ -8,13 +8,23 @@ Integrates with the SwarmBuilder via the /api/self-rewrite REST endpoint.
 
 import os
 import json
+import time
+import asyncio
 import re
 import hashlib
 import logging
+import mmap
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Generator
 
+import lexer
+from cache import AnalysisCache, LLMResponseCache, content_checksum
+from optimizer import LLMOptimizer
+from typecheck import TypeCheckError, TypeCheckService, TypeCheckUnavailable
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [META] %(levelname)s — %(message)s"
@@ -24,15 +34,109 @@ logger = logging.getLogger(__name__)
 
 # ─── Data Structures ──────────────────────────────────────────────────────────
 
-@dataclass
+MMAP_THRESHOLD = 1 << 20  # Files at least this large are decoded straight from an mmap
+
+
+def read_source(file_path: Path) -> str:
+    """Read a source file as Path.read_text() would (UTF-8, universal newlines); large files go through mmap."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            text = f.read().decode("utf-8")
+        else:  # Decode from the page cache instead of first copying the file into a bytes object
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
 class SourceModule:
-    """Represents a scanned source file from Self-R's own codebase."""
-    path: str
-    filename: str
-    content: str
-    checksum: str
-    line_count: int
-    language: str = "typescript"
+    """
+    Represents a scanned source file from Self-R's own codebase.
+
+    A compact record: only metadata is kept for good. `content` is read from disk on
+    demand, and is held in memory only while the module's ContentBudget has room for it.
+    """
+
+    __slots__ = ("path", "filename", "checksum", "line_count", "language", "size", "_content", "_budget")
+
+    def __init__(self, path: str, filename: str, content: str | None, checksum: str, line_count: int,
+                 language: str = "typescript", size: int | None = None, budget: "ContentBudget | None" = None):
+        self.path = path
+        self.filename = filename
+        self.checksum = checksum
+        self.line_count = line_count
+        self.language = language
+        self.size = len(content) if size is None and content is not None else (size or 0)  # Characters
+        self._content = content
+        self._budget = None
+        if budget is not None:
+            budget.hold(self)
+
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            if self._budget is not None:
+                self._budget.touch(self)
+            return self._content
+        content = read_source(Path(self.path))
+        self.size = len(content)
+        if self._budget is not None:
+            self._content = content
+            self._budget.hold(self)
+        return content
+
+    @property
+    def loaded(self) -> bool:
+        return self._content is not None
+
+    def release(self):
+        """Drop the in-memory content; the next access reads the file again."""
+        if self._budget is not None:
+            self._budget.forget(self)
+        self._content = None
+
+    def __repr__(self) -> str:
+        return (f"SourceModule(path={self.path!r}, checksum={self.checksum!r}, line_count={self.line_count}, "
+                f"language={self.language!r}, loaded={self.loaded})")
+
+
+class ContentBudget:
+    """
+    Caps the total size of module contents held in memory.
+
+    Modules are kept in least-recently-used order; holding one more module releases
+    the oldest contents until the total fits `max_chars` again.
+    """
+
+    def __init__(self, max_chars: int = 32 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.used = 0
+        self._held: OrderedDict[int, SourceModule] = OrderedDict()
+
+    def hold(self, module: SourceModule):
+        """Keep a module's loaded content, evicting older contents if over budget."""
+        if module._budget is not None and module._budget is not self:
+            module._budget.forget(module)
+        module._budget = self
+        if module._content is None:
+            return
+        if id(module) in self._held:
+            return self.touch(module)
+        self._held[id(module)] = module
+        self.used += module.size
+        while self.used > self.max_chars and self._held:
+            _, oldest = self._held.popitem(last=False)
+            self.used -= oldest.size
+            oldest._content = None
+
+    def touch(self, module: SourceModule):
+        if id(module) in self._held:
+            self._held.move_to_end(id(module))
+
+    def forget(self, module: SourceModule):
+        if self._held.pop(id(module), None) is not None:
+            self.used -= module.size
 
 
 @dataclass
@@ -45,6 +149,7 @@ class RewriteProposal:
     provider: str  # Which LLM generated the proposal
     confidence: float = 0.0
     accepted: bool = False
+    locations: list[dict] = field(default_factory=list)  # [{"line", "col"}] of static hits
 
 
 @dataclass
@@ -52,10 +157,84 @@ class ReplicationSession:
     """Tracks a full self-analysis and rewrite cycle."""
     session_id: str
     objective: str
-    scanned_files: list[SourceModule] = field(default_factory=list)
+    scanned_files: list[SourceModule] = field(default_factory=list)  # New or changed files; content is re-read on demand
     proposals: list[RewriteProposal] = field(default_factory=list)
     applied: list[str] = field(default_factory=list)
     errors: list[str] = field(default_factory=list)
+    unchanged_files: int = 0
+    cached_files: int = 0  # Read but not analyzed: findings for the same content came from the analysis cache
+    findings: dict[str, list[dict]] = field(default_factory=dict)  # Static findings by path relative to src/
+    deep_analysis: dict = field(default_factory=dict)  # Stats of the LLM pass, once it has run
+
+    @property
+    def total_files(self) -> int:
+        """Every file examined: the changed ones analyzed plus the unchanged ones skipped."""
+        return len(self.scanned_files) + self.unchanged_files
+
+
+# ─── Scan Manifest ─────────────────────────────────────────────────────────────
+
+class ScanManifest:
+    """
+    On-disk record of the last scan: relative path → size, mtime_ns, checksum and findings.
+
+    Lets the scanner skip files whose stat is unchanged without reading them. The
+    manifest is discarded when the static analysis rules change, since the stored
+    findings would be stale.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, rules_version: str = ""):
+        self.path = Path(path)
+        self.rules_version = rules_version
+        self.entries: dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable scan manifest {self.path}: {e}")
+            return
+        if data.get("version") != self.VERSION or data.get("rules_version") != self.rules_version:
+            logger.info("Scan manifest is from another version or rule set — starting fresh.")
+            return
+        self.entries = data.get("files", {})
+
+    def save(self):
+        """Write atomically so an interrupted cycle never leaves a truncated manifest."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": self.VERSION,
+            "rules_version": self.rules_version,
+            "files": self.entries,
+        }), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def unchanged(self, key: str, st: os.stat_result) -> bool:
+        entry = self.entries.get(key)
+        return (entry is not None and entry.get("findings") is not None
+                and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns)
+
+    def record(self, key: str, st: os.stat_result, checksum: str):
+        """Store a file's stat and checksum. Findings are kept only if the content is unchanged."""
+        entry = self.entries.get(key)
+        findings = entry.get("findings") if entry and entry["checksum"] == checksum else None
+        self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "checksum": checksum, "findings": findings}
+
+    def set_findings(self, key: str, findings: list[dict]):
+        self.entries[key]["findings"] = findings
+
+    def prune(self, seen: set[str]) -> list[str]:
+        """Forget files that no longer exist. Returns the removed keys."""
+        removed = [key for key in self.entries if key not in seen]
+        for key in removed:
+            del self.entries[key]
+        return removed
 
 
 # ─── Source Scanner ────────────────────────────────────────────────────────────
@@ -66,58 +245,267 @@ class SourceScanner:
     EXCLUDED_DIRS = {"node_modules", "dist", "completions", ".git", "skills"}
     ALLOWED_EXTENSIONS = {".ts", ".js", ".py"}
 
-    def __init__(self, src_root: str):
+    def __init__(self, src_root: str, manifest: ScanManifest | None = None,
+                 follow_symlinks: bool = False, threads: int = 1):
         self.src_root = Path(src_root)
+        self.manifest = manifest
+        self.follow_symlinks = follow_symlinks
+        self.threads = max(1, threads)
+        self.unchanged = 0
+        # filename → sorted relative paths; built by the first scan or lookup, refreshed by every scan
+        self._by_name: dict[str, list[str]] | None = None
 
-    def scan(self) -> Generator[SourceModule, None, None]:
-        """Yield all non-excluded source modules from the src directory."""
-        for file_path in self.src_root.rglob("*"):
-            if not file_path.is_file():
-                continue
-            if any(part in self.EXCLUDED_DIRS for part in file_path.parts):
+    def key(self, module: SourceModule) -> str:
+        """Manifest key of a module: its path relative to src_root."""
+        return Path(module.path).relative_to(self.src_root).as_posix()
+
+    def _scan_dir(self, directory: str) -> tuple[list[Path], list[tuple[str, tuple | None]]]:
+        """
+        List one directory: (source files, subdirectories to enter).
+
+        Excluded directories are dropped here, before anything inside them is
+        listed. Subdirectories carry their (st_dev, st_ino) when symlinks are
+        followed, so the walk can detect loops.
+        """
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if entry.name in self.EXCLUDED_DIRS:
+                                continue
+                            ident = None
+                            if self.follow_symlinks:
+                                st = entry.stat()
+                                ident = (st.st_dev, st.st_ino)
+                            subdirs.append((entry.path, ident))
+                        elif entry.is_file() and os.path.splitext(entry.name)[1] in self.ALLOWED_EXTENSIONS:
+                            files.append(Path(entry.path))
+                    except OSError as e:  # Dangling symlink, permission denied, ...
+                        logger.warning(f"Skipping {entry.path}: {e}")
+        except OSError as e:
+            logger.warning(f"Could not list {directory}: {e}")
+        return files, subdirs
+
+    def iter_files(self) -> Generator[Path, None, None]:
+        """Yield paths of all non-excluded source files under src_root."""
+        if not self.src_root.is_dir():
+            return
+        visited = set()
+        if self.follow_symlinks:
+            st = self.src_root.stat()
+            visited.add((st.st_dev, st.st_ino))
+
+        def enter(subdirs):
+            for path, ident in subdirs:
+                if ident is not None:
+                    if ident in visited:
+                        logger.warning(f"Skipping {path}: symlink loop")
+                        continue
+                    visited.add(ident)
+                yield path
+
+        if self.threads == 1:
+            stack = [str(self.src_root)]
+            while stack:
+                files, subdirs = self._scan_dir(stack.pop())
+                yield from files
+                stack.extend(reversed(list(enter(subdirs))))
+            return
+
+        # Each directory listing is a pool task; results queue up further directories as they arrive.
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="meta-scan") as pool:
+            pending = {pool.submit(self._scan_dir, str(self.src_root))}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    yield from files
+                    pending |= {pool.submit(self._scan_dir, path) for path in enter(subdirs)}
+
+    @staticmethod
+    def load(file_path: Path) -> SourceModule:
+        """Read a file into a module whose content is loaded (until released or evicted by a budget)."""
+        content = read_source(file_path)
+        return SourceModule(
+            path=str(file_path),
+            filename=file_path.name,
+            content=content,
+            checksum=content_checksum(content),
+            line_count=len(content.splitlines()),
+            language="python" if file_path.suffix == ".py" else "typescript",
+        )
+
+    def changed(self, full: bool = False) -> Generator[tuple[str, Path, os.stat_result], None, None]:
+        """
+        Yield (manifest key, path, stat) for every file that needs reading.
+
+        With a manifest, files whose stat is unchanged are skipped (counted in
+        `self.unchanged`); `full=True` yields everything. Once exhausted, the
+        manifest is pruned and the filename index refreshed.
+        """
+        seen = set()
+        self.unchanged = 0
+        for file_path in self.iter_files():
+            key = file_path.relative_to(self.src_root).as_posix()
+            seen.add(key)
+            self._index_add(key)
+            try:
+                st = file_path.stat()
+            except OSError as e:
+                logger.warning(f"Could not read {file_path}: {e}")
                 continue
-            if file_path.suffix not in self.ALLOWED_EXTENSIONS:
+            if self.manifest is not None and not full and self.manifest.unchanged(key, st):
+                self.unchanged += 1
                 continue
+            yield key, file_path, st
 
+        if self.manifest is not None:
+            self.manifest.prune(seen)
+        self._index_replace(seen)
+
+    def known_checksum(self, key: str, full: bool = False) -> str | None:
+        """Checksum under which the manifest already holds findings for a file, if any."""
+        if self.manifest is None or full:
+            return None
+        prev = self.manifest.entries.get(key)
+        return prev["checksum"] if prev is not None and prev.get("findings") is not None else None
+
+    def scan(self, full: bool = False) -> Generator[SourceModule, None, None]:
+        """
+        Yield non-excluded source modules from the src directory.
+
+        With a manifest, only new or changed files are yielded (counted in
+        `self.unchanged` otherwise); `full=True` yields everything regardless.
+        """
+        for key, file_path, st in self.changed(full):
             try:
-                content = file_path.read_text(encoding="utf-8")
-                checksum = hashlib.sha256(content.encode()).hexdigest()[:12]
-                lang = "python" if file_path.suffix == ".py" else "typescript"
-
-                yield SourceModule(
-                    path=str(file_path),
-                    filename=file_path.name,
-                    content=content,
-                    checksum=checksum,
-                    line_count=len(content.splitlines()),
-                    language=lang,
-                )
+                module = self.load(file_path)
             except Exception as e:
                 logger.warning(f"Could not read {file_path}: {e}")
+                continue
 
-    def get_module(self, filename: str) -> SourceModule | None:
-        """Retrieve a specific module by filename."""
-        for module in self.scan():
-            if module.filename == filename:
-                return module
+            if self.manifest is not None:
+                known = self.known_checksum(key, full)
+                self.manifest.record(key, st, module.checksum)
+                # Touched but identical (e.g. git checkout) — refresh the stat, skip the work
+                if known == module.checksum:
+                    self.unchanged += 1
+                    continue
+            yield module
+
+    # ── Filename index ──
+
+    def _index_add(self, key: str):
+        if self._by_name is None:
+            return
+        paths = self._by_name.setdefault(key.rsplit("/", 1)[-1], [])
+        if key not in paths:
+            paths.append(key)
+            paths.sort()
+
+    def _index_discard(self, key: str):
+        name = key.rsplit("/", 1)[-1]
+        paths = (self._by_name or {}).get(name, [])
+        if key in paths:
+            paths.remove(key)
+            if not paths:
+                del self._by_name[name]
+
+    def _index_replace(self, keys: set[str]):
+        by_name: dict[str, list[str]] = {}
+        for key in sorted(keys):
+            by_name.setdefault(key.rsplit("/", 1)[-1], []).append(key)
+        self._by_name = by_name
+
+    def build_index(self):
+        """Walk the tree once (without reading files) to map filenames to paths."""
+        self._index_replace({p.relative_to(self.src_root).as_posix() for p in self.iter_files()})
+
+    def note_file(self, path: str):
+        """Keep the index current after a file is written or removed outside a scan."""
+        key = Path(os.path.relpath(path, self.src_root)).as_posix()
+        if os.path.isfile(path):
+            self._index_add(key)
+        else:
+            self._index_discard(key)
+
+    def candidates(self, filename: str) -> list[str]:
+        """Relative paths of every indexed file with this name."""
+        if self._by_name is None:
+            self.build_index()
+        return list(self._by_name.get(filename, []))
+
+    def resolve(self, name: str) -> Path | None:
+        """
+        Find a source file by path relative to src_root or, failing that, by filename.
+
+        A relative path that exists is authoritative, so a top-level `index.ts` is never
+        mistaken for `foo/index.ts`. A bare filename is only looked up by name when no
+        file has that exact path, and a name shared by several files resolves to None
+        (pass the relative path instead).
+        """
+        if self._by_name is None:
+            self.build_index()
+        key = name.strip("/")
+        if not key.startswith("../") and (self.src_root / key).is_file():
+            self._index_add(key)  # Created since the last scan
+        if key in self._by_name.get(key.rsplit("/", 1)[-1], []):
+            paths = [key]
+        elif "/" in key:
+            paths = []
+        else:
+            paths = self._by_name.get(key, [])
+            if len(paths) > 1:
+                logger.error(f"'{name}' is ambiguous ({', '.join(paths)}); pass the path relative to {self.src_root}")
+                return None
+        for key in list(paths):
+            file_path = self.src_root / key
+            if file_path.is_file():
+                return file_path
+            self._index_discard(key)  # Deleted since the last scan
         return None
 
+    def get_module(self, filename: str) -> SourceModule | None:
+        """Retrieve a specific module by filename (or relative path). Only that file is read."""
+        file_path = self.resolve(filename)
+        if file_path is None:
+            return None
+        try:
+            return self.load(file_path)
+        except Exception as e:
+            logger.warning(f"Could not read {file_path}: {e}")
+            return None
+
 
 # ─── Static Analyzer ──────────────────────────────────────────────────────────
 
 class StaticAnalyzer:
-    """Runs rule-based static analysis on source modules to find known patterns."""
+    """
+    Runs rule-based static analysis on source modules to find known patterns.
+
+    By default rules with a token/AST predicate in lexer.py run on tokens, so they never
+    match inside strings or comments. Regex rules are compiled once. Their prefilters —
+    cheap patterns found on every line the full pattern matches, defaulting to the
+    pattern itself — are joined into a single alternation used as a gate: one regex
+    pass over the file finds the lines where some rule can match, and a rule's full
+    pattern only runs on lines where its own prefilter hits. Rules match within a
+    single line.
+    """
 
     RULES = [
         {
             "id": "unhandled-promise",
             "pattern": r"(?<!await\s)\b\w+\.\w+\(.*\)\s*;",
+            "prefilter": r"\.\w+\(",
             "description": "Potential unhandled Promise — missing await or .catch()",
             "priority": "high",
         },
         {
             "id": "error-return-string",
             "pattern": r"return\s+chalk\.(red|yellow)\(",
+            "prefilter": r"chalk\.",
             "description": "Error returned as colored string instead of being thrown — corrupts downstream consumers",
             "priority": "critical",
         },
@@ -135,22 +523,317 @@ class StaticAnalyzer:
         },
     ]
 
+    BACKENDS = ("token", "regex")
+
+    def __init__(self, enabled: set[str] | None = None, disabled: set[str] | None = None, backend: str = "token"):
+        """
+        Args:
+            enabled: Rule ids to run (default: all).
+            disabled: Rule ids to skip.
+            backend: "token" evaluates rules that have a lexer/AST predicate (see lexer.py) on
+                tokens and the rest by regex; "regex" uses the regex patterns for everything.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Choose from: {', '.join(self.BACKENDS)}")
+        known = {rule["id"] for rule in self.RULES}
+        unknown = (set(enabled or ()) | set(disabled or ())) - known
+        if unknown:
+            raise ValueError(f"Unknown rule id(s): {', '.join(sorted(unknown))}")
+        self.backend = backend
+        self.rules = []
+        for rule in self.RULES:
+            if (enabled is None or rule["id"] in enabled) and rule["id"] not in (disabled or ()):
+                pattern = re.compile(rule["pattern"], re.MULTILINE)
+                prefilter = re.compile(rule["prefilter"], re.MULTILINE) if rule.get("prefilter") else None
+                self.rules.append((rule, pattern, prefilter))
+        self._gates: dict[tuple[str, ...], re.Pattern] = {}
+        active = [rule for rule, _, _ in self.rules]
+        fingerprint = json.dumps([f"token-{lexer.VERSION}" if backend == "token" else "regex", active], sort_keys=True)
+        self._version = hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+
+    def rules_version(self) -> str:
+        """Fingerprint of the active rules and backend; stored findings are only valid for the same version."""
+        return self._version
+
+    def cached(self, module: SourceModule, cache: AnalysisCache) -> list[dict] | None:
+        """Findings stored for this content under the current rules, relabelled with the module's filename."""
+        findings = cache.get("static", module.checksum, self._version)
+        if findings is None:
+            return None
+        return [{**f, "file": module.filename} for f in findings]
+
+    def _gate_for(self, rules: list[tuple]) -> re.Pattern:
+        ids = tuple(rule["id"] for rule, _, _ in rules)
+        gate = self._gates.get(ids)
+        if gate is None:
+            gate = self._gates[ids] = re.compile(
+                "|".join(f"(?:{rule.get('prefilter') or rule['pattern']})" for rule, _, _ in rules), re.MULTILINE)
+        return gate
+
+    def _regex_hits(self, content: str, rules: list[tuple]) -> dict[str, list[tuple[int, int]]]:
+        """Run regex rules in one gated pass over the content."""
+        hits: dict[str, list[tuple[int, int]]] = {rule["id"]: [] for rule, _, _ in rules}
+        gate = self._gate_for(rules)
+        pos, line_no, counted = 0, 1, 0
+        while True:
+            m = gate.search(content, pos)
+            if m is None:
+                break
+            start = content.rfind("\n", 0, m.start()) + 1
+            end = content.find("\n", m.start())
+            if end == -1:
+                end = len(content)
+            line_no += content.count("\n", counted, start)
+            counted = start
+            for rule, pattern, prefilter in rules:
+                if prefilter is not None and prefilter.search(content, start, end) is None:
+                    continue
+                for hit in pattern.finditer(content, start, end):
+                    hits[rule["id"]].append((line_no, hit.start() - start + 1))
+            pos = end + 1
+        return hits
+
     def analyze(self, module: SourceModule) -> list[dict]:
-        """Return list of rule violations found in a module."""
+        """Return list of rule violations found in a module, with 1-based line/col of every hit."""
+        hits: dict[str, list[tuple[int, int]]] = {}
+        content = module.content
+        regex_rules = self.rules
+        if self.backend == "token":
+            native = lexer.find(module.language, content, module.checksum,
+                                [rule["id"] for rule, _, _ in self.rules])
+            if native is not None:  # None: unparsable (e.g. a Python syntax error) — regex for everything
+                hits.update(native)
+                regex_rules = [r for r in self.rules if r[0]["id"] not in native]
+        if regex_rules:
+            hits.update(self._regex_hits(content, regex_rules))
+
         findings = []
-        for rule in self.RULES:
-            matches = list(re.finditer(rule["pattern"], module.content, re.MULTILINE))
-            if matches:
+        for rule, _, _ in self.rules:
+            locations = hits.get(rule["id"])
+            if locations:
                 findings.append({
                     "rule_id": rule["id"],
                     "description": rule["description"],
                     "priority": rule["priority"],
-                    "match_count": len(matches),
+                    "match_count": len(locations),
+                    "locations": [{"line": line, "col": col} for line, col in locations],
                     "file": module.filename,
                 })
         return findings
 
 
+# ─── Parallel Analysis ─────────────────────────────────────────────────────────
+
+# Per-process analyzer and (read-only) cache, built once by the pool initializer
+_worker_analyzer: StaticAnalyzer | None = None
+_worker_cache: AnalysisCache | None = None
+
+
+def _init_worker(rule_ids: list[str], backend: str, cache_root: str | None):
+    global _worker_analyzer, _worker_cache
+    _worker_analyzer = StaticAnalyzer(enabled=set(rule_ids), backend=backend)
+    _worker_cache = AnalysisCache(cache_root) if cache_root else None
+
+
+def _analyze_chunk(chunk: list[tuple[str, str, str | None]]) -> list[tuple]:
+    """
+    Read and analyze a chunk of files inside a worker process.
+
+    Each item is (key, path, known checksum). Only results travel back — never file
+    contents: (key, checksum, line_count, language, findings, cached, error). `findings`
+    is None when the checksum equals the known one, i.e. the stored findings still hold;
+    `cached` is True when they came from the analysis cache. Workers only read the
+    cache — the parent stores fresh findings.
+    """
+    results = []
+    for key, path, known in chunk:
+        try:
+            module = SourceScanner.load(Path(path))
+        except Exception as e:
+            results.append((key, None, 0, None, None, False, str(e)))
+            continue
+        findings, cached = None, False
+        if module.checksum != known:
+            findings = _worker_analyzer.cached(module, _worker_cache) if _worker_cache is not None else None
+            cached = findings is not None
+            if not cached:
+                findings = _worker_analyzer.analyze(module)
+        results.append((key, module.checksum, module.line_count, module.language, findings, cached, None))
+    return results
+
+
+def chunked(items: list, jobs: int, max_chunk: int = 64) -> list[list]:
+    """Split work into about four chunks per worker, so pickling is amortized but stragglers stay short."""
+    size = max(1, min(max_chunk, -(-len(items) // (jobs * 4))))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ─── LLM Deep Analysis ─────────────────────────────────────────────────────────
+
+PRIORITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls per second, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, deadline: float | None = None) -> bool:
+        """Wait for a call slot. Returns False, without waiting, if none frees up before `deadline` (monotonic)."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+                if deadline is not None and now + delay > deadline:
+                    return False
+                await asyncio.sleep(delay)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token); the server does not report usage."""
+    return len(text) // 4 + 1
+
+
+class DeepAnalysisStage:
+    """
+    Phase 3 of a session: LLM quality audits, then rewrite proposals for low-scoring files.
+
+    Files run concurrently (at most `concurrency` at a time) in priority order — worst
+    static finding first, then most hits. Calls to each provider go through its own
+    rate limiter. Once the estimated token budget or the time budget is spent, no new
+    file is started. Proposals are appended to the session as they arrive.
+    """
+
+    def __init__(self, optimizer: LLMOptimizer, concurrency: int = 4, rate_limits: dict[str, float] | None = None,
+                 provider: str = "Kimi", audit_provider: str = "Kimi", token_budget: int | None = None,
+                 time_budget: float | None = None, score_threshold: int = 7, on_proposal=None):
+        """
+        Args:
+            optimizer: Client for the Self-R server's /api/analyze and /api/rewrite.
+            concurrency: Files processed at the same time.
+            rate_limits: Provider name → calls per second. "*" applies to unlisted providers.
+            provider: Provider that writes rewrite proposals.
+            audit_provider: Provider the server uses for quality audits (for rate limiting).
+            token_budget: Estimated prompt + response tokens after which no file is started.
+            time_budget: Seconds after which no file is started.
+            score_threshold: Audit score at or above which a file is left alone.
+            on_proposal: Called with every RewriteProposal as soon as it is produced.
+        """
+        self.optimizer = optimizer
+        self.concurrency = max(1, concurrency)
+        self.rate_limits = rate_limits or {}
+        self.provider = provider
+        self.audit_provider = audit_provider
+        self.token_budget = token_budget
+        self.time_budget = time_budget
+        self.score_threshold = score_threshold
+        self.on_proposal = on_proposal
+        self._limiters: dict[str, RateLimiter | None] = {}
+
+    @staticmethod
+    def rank(key: str, findings: list[dict]) -> tuple:
+        worst = min((PRIORITY_RANK.get(f["priority"], 4) for f in findings), default=4)
+        return worst, -sum(f.get("match_count", 1) for f in findings), key
+
+    def _exhausted(self) -> str | None:
+        if self.token_budget is not None and self.tokens_used >= self.token_budget:
+            return "token budget"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "time budget"
+        return None
+
+    async def _limit(self, provider: str) -> bool:
+        """Wait out the provider's rate limit. False if the time budget ends first."""
+        if provider not in self._limiters:
+            rate = self.rate_limits.get(provider, self.rate_limits.get("*"))
+            self._limiters[provider] = RateLimiter(rate) if rate else None
+        limiter = self._limiters[provider]
+        return limiter is None or await limiter.acquire(self.deadline)
+
+    async def run(self, session: ReplicationSession, files: dict[str, list[dict]], load) -> dict:
+        """
+        Audit `files` (relative path → static findings) and stream proposals into `session`.
+
+        `load(key)` returns the file's SourceModule (or None); it runs in a worker thread.
+        Returns the stats also stored in `session.deep_analysis`.
+        """
+        self.tokens_used = 0
+        self.deadline = time.monotonic() + self.time_budget if self.time_budget is not None else None
+        stats = {"files": len(files), "audited": 0, "proposals": 0, "skipped": 0, "failed": 0, "stopped_by": None}
+        slots = asyncio.Semaphore(self.concurrency)
+
+        def stop(reason: str | None = None) -> bool:
+            """True (and the file counted as skipped) once a budget is spent."""
+            reason = reason or self._exhausted()
+            if reason is not None:
+                stats["skipped"] += 1
+                stats["stopped_by"] = stats["stopped_by"] or reason
+            return reason is not None
+
+        async def process(key: str, findings: list[dict]):
+            async with slots:
+                if stop():
+                    return
+                module = await asyncio.to_thread(load, key)
+                if module is None:
+                    stats["failed"] += 1
+                    return
+                content = module.content
+
+                if stop(None if await self._limit(self.audit_provider) else "time budget"):
+                    return
+                audit = await self.optimizer.analyze_module_quality_async(module.filename, content)
+                self.tokens_used += estimate_tokens(content) + estimate_tokens(json.dumps(audit))
+                if audit.get("error"):
+                    stats["failed"] += 1
+                    session.errors.append(f"Audit of {key} failed: {audit['error']}")
+                    return
+                stats["audited"] += 1
+                score = audit.get("score", 10)
+                if not isinstance(score, (int, float)) or score >= self.score_threshold:
+                    return
+
+                issues = list(audit.get("issues") or [])[:3] + [f"{f['rule_id']}: {f['description']}" for f in findings]
+                issue = "; ".join(issues) or f"Score {score}/10 — general quality improvement"
+                if stop(None if await self._limit(self.provider) else "time budget"):
+                    return
+                proposed = await self.optimizer.propose_rewrite_async(module.filename, content, issue, self.provider)
+                self.tokens_used += estimate_tokens(content) + estimate_tokens(proposed or "")
+                if not proposed:
+                    stats["failed"] += 1
+                    return
+                worst = min((f["priority"] for f in findings), key=lambda p: PRIORITY_RANK.get(p, 4), default="medium")
+                proposal = RewriteProposal(
+                    target_file=key,
+                    issue_description=f"[LLM][score {score}/10] {issue}",
+                    proposed_change=proposed,
+                    priority=worst,
+                    provider=self.provider,
+                    confidence=round(1 - score / 10, 2),
+                )
+                session.proposals.append(proposal)
+                stats["proposals"] += 1
+                logger.info(f"Deep analysis: proposal for {key} (score {score}/10)")
+                if self.on_proposal is not None:
+                    self.on_proposal(proposal)
+
+        ordered = sorted(files.items(), key=lambda item: self.rank(*item))
+        await asyncio.gather(*(process(key, findings) for key, findings in ordered))
+        stats["tokens_used"] = self.tokens_used
+        session.deep_analysis = stats
+        return stats
+
+
 # ─── Replication Engine ────────────────────────────────────────────────────────
 
 class ReplicationEngine:
@@ -160,21 +843,54 @@ class ReplicationEngine:
     Workflow:
         1. Scan source files
         2. Static analysis pass (fast, rule-based)
-        3. LLM deep analysis pass (slow, per-file, via HTTP to running Self-R server)
+        3. LLM deep analysis pass (slow, per-file, via HTTP to running Self-R server; run_deep_analysis)
         4. Emit RewriteProposal list
         5. Apply accepted proposals with safety gate (tsc check)
     """
 
-    def __init__(self, project_root: str, api_base: str = "http://localhost:8080"):
+    MANIFEST_PATH = ".meta/scan_manifest.json"
+    CACHE_DIR = ".meta/cache"
+    LLM_CACHE_FILE = "llm_responses.sqlite"
+
+    def __init__(self, project_root: str, api_base: str = "http://localhost:8080", use_manifest: bool = True,
+                 follow_symlinks: bool = False, scan_threads: int = 1,
+                 enabled_rules: set[str] | None = None, disabled_rules: set[str] | None = None,
+                 backend: str = "token", jobs: int = 1, use_cache: bool = True, cache_dir: str | None = None,
+                 cache_max_bytes: int = 64 * 1024 * 1024, content_budget: int = 32 * 1024 * 1024,
+                 llm_cache_ttl: float = 7 * 24 * 3600):
         self.project_root = Path(project_root)
         self.src_root = self.project_root / "src"
         self.api_base = api_base
-        self.scanner = SourceScanner(str(self.src_root))
-        self.static_analyzer = StaticAnalyzer()
+        self.static_analyzer = StaticAnalyzer(enabled=enabled_rules, disabled=disabled_rules, backend=backend)
+        self.manifest = None
+        if use_manifest:
+            self.manifest = ScanManifest(str(self.project_root / self.MANIFEST_PATH), self.static_analyzer.rules_version())
+        self.scanner = SourceScanner(str(self.src_root), manifest=self.manifest,
+                                     follow_symlinks=follow_symlinks, threads=scan_threads)
+        self.jobs = max(1, jobs)
+        # Session modules keep their content only within this budget (characters) and re-read it on demand
+        self.content_budget = ContentBudget(content_budget)
+        # Point several Wagons at one cache_dir (or META_CACHE_DIR) to share results for identical content
+        self.cache = None
+        self.llm_cache = None  # Opened by the first deep analysis
+        if use_cache:
+            cache_dir = cache_dir or os.environ.get("META_CACHE_DIR") or str(self.project_root / self.CACHE_DIR)
+            self.cache = AnalysisCache(cache_dir, max_bytes=cache_max_bytes)
+        self.llm_cache_ttl = llm_cache_ttl
+        # Warm tsserver for in-memory checks of proposed content; incremental tsc for on-disk checks
+        self.typecheck = TypeCheckService(str(self.project_root))
         logger.info(f"ReplicationEngine initialized. Project root: {self.project_root}")
 
-    def run_analysis_session(self, objective: str = "Improve overall code quality and correctness") -> ReplicationSession:
-        """Execute a full self-analysis cycle and return a ReplicationSession."""
+    def run_analysis_session(self, objective: str = "Improve overall code quality and correctness",
+                             full: bool = False) -> ReplicationSession:
+        """
+        Execute a self-analysis cycle and return a ReplicationSession.
+
+        Only new or changed files are read; findings for unchanged files come from the
+        scan manifest, and changed files whose content was analyzed before (by any
+        session sharing the cache directory) take their findings from the analysis
+        cache. `full=True` rescans everything.
+        """
         import uuid
         session = ReplicationSession(
             session_id=uuid.uuid4().hex[:8],
@@ -183,15 +899,41 @@ class ReplicationEngine:
 
         logger.info(f"Starting analysis session [{session.session_id}]: {objective}")
 
-        # Phase 1: Scan
-        modules = list(self.scanner.scan())
-        session.scanned_files = modules
-        logger.info(f"Scanned {len(modules)} source modules.")
+        # Phase 1 + 2: Scan and static analysis
+        if self.jobs > 1:
+            analyzed = self._scan_parallel(full)
+        else:
+            analyzed = []
+            for module in self.scanner.scan(full=full):
+                findings = self.static_analyzer.cached(module, self.cache) if self.cache is not None else None
+                cached = findings is not None
+                if not cached:
+                    findings = self.static_analyzer.analyze(module)
+                self.content_budget.hold(module)
+                analyzed.append((module, findings, cached))
+        session.scanned_files = [module for module, _, _ in analyzed]
+        session.unchanged_files = self.scanner.unchanged
+        session.cached_files = sum(cached for _, _, cached in analyzed)
+        logger.info(f"Scanned {len(analyzed)} new or changed source modules ({session.unchanged_files} unchanged, "
+                    f"{session.cached_files} served from the analysis cache).")
+
+        per_file = {}
+        version = self.static_analyzer.rules_version()
+        for module, findings, cached in analyzed:
+            if self.cache is not None and not cached:
+                self.cache.put("static", module.checksum, version, findings)
+            if self.manifest is not None:
+                self.manifest.set_findings(self.scanner.key(module), findings)
+            else:
+                per_file[self.scanner.key(module)] = findings
+        if self.manifest is not None:
+            per_file = {key: entry["findings"] or [] for key, entry in self.manifest.entries.items()}
+            self.manifest.save()
+        per_file = dict(sorted(per_file.items()))
+        session.findings = per_file
 
-        # Phase 2: Static Analysis
         all_findings = []
-        for module in modules:
-            findings = self.static_analyzer.analyze(module)
+        for findings in per_file.values():
             for f in findings:
                 all_findings.append(f)
                 proposal = RewriteProposal(
@@ -201,16 +943,102 @@ class ReplicationEngine:
                     priority=f["priority"],
                     provider="StaticAnalyzer",
                     confidence=0.95,
+                    locations=f.get("locations", []),
                 )
                 session.proposals.append(proposal)
 
-        logger.info(f"Static analysis found {len(all_findings)} issues across {len(modules)} files.")
+        logger.info(f"Static analysis found {len(all_findings)} issues across {len(per_file)} files.")
         return session
 
+    def run_deep_analysis(self, session: ReplicationSession, concurrency: int = 4,
+                          rate_limits: dict[str, float] | None = None, provider: str = "Kimi",
+                          token_budget: int | None = None, time_budget: float | None = None,
+                          on_proposal=None, optimizer: LLMOptimizer | None = None,
+                          trace_id: str | None = None) -> dict:
+        """
+        Run the LLM deep-analysis phase over a session (see DeepAnalysisStage).
+
+        Covers every file with static findings plus the files changed in this session.
+        Audits and rewrites go through the LLM response cache (next to the analysis
+        cache), so unchanged content is not sent to the LLM again. Returns the stage's stats.
+
+        `trace_id` is forwarded on every LLM call (X-Trace-Id) together with the
+        remaining time budget (X-Deadline-Ms).
+        """
+        own_optimizer = optimizer is None
+        if own_optimizer:
+            if self.cache is not None and self.llm_cache is None:
+                self.llm_cache = LLMResponseCache(str(self.cache.root / self.LLM_CACHE_FILE), ttl=self.llm_cache_ttl,
+                                                  max_bytes=self.cache.max_bytes)
+            deadline = time.time() + time_budget if time_budget is not None else None
+            optimizer = LLMOptimizer(self.api_base, trace_id=trace_id, deadline=deadline, cache=self.llm_cache,
+                                     max_connections=concurrency)
+        files = {key: findings for key, findings in session.findings.items() if findings}
+        for module in session.scanned_files:
+            files.setdefault(self.scanner.key(module), [])
+        stage = DeepAnalysisStage(optimizer, concurrency=concurrency, rate_limits=rate_limits, provider=provider,
+                                  token_budget=token_budget, time_budget=time_budget, on_proposal=on_proposal)
+        logger.info(f"Deep analysis of {len(files)} files (concurrency {stage.concurrency}).")
+        try:
+            stats = asyncio.run(stage.run(session, files, self.scanner.get_module))
+        finally:
+            if own_optimizer:
+                optimizer.close()
+        if optimizer.cache is not None:
+            stats["llm_cache"] = optimizer.cache.stats()
+        logger.info(f"Deep analysis: {stats['audited']} audited, {stats['proposals']} proposals, {stats['failed']} failed, "
+                    f"{stats['skipped']} skipped" + (f" ({stats['stopped_by']} spent)" if stats["stopped_by"] else "") + ".")
+        return stats
+
+    def _scan_parallel(self, full: bool) -> list[tuple[SourceModule, list[dict], bool]]:
+        """
+        Read and analyze changed files across a process pool.
+
+        The tree walk, manifest bookkeeping and cache writes stay in this process; workers
+        get chunks of paths and return checksums and findings (and whether they were
+        cached). Results come back in path order. The returned modules are not loaded;
+        their content is read on first access.
+        """
+        pending = sorted(self.scanner.changed(full), key=lambda item: item[0])
+        stats = {key: st for key, _, st in pending}
+        work = [(key, str(path), self.scanner.known_checksum(key, full)) for key, path, _ in pending]
+        if not work:
+            return []
+
+        analyzer = self.static_analyzer
+        workers = min(self.jobs, len(work))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=([rule["id"] for rule, _, _ in analyzer.rules], analyzer.backend,
+                                           str(self.cache.root) if self.cache is not None else None)) as pool:
+            chunks = list(pool.map(_analyze_chunk, chunked(work, workers)))
+
+        analyzed = []
+        for key, checksum, line_count, language, findings, cached, error in (r for chunk in chunks for r in chunk):
+            file_path = self.src_root / key
+            if error is not None:
+                logger.warning(f"Could not read {file_path}: {error}")
+                continue
+            if self.manifest is not None:
+                self.manifest.record(key, stats[key], checksum)
+            if findings is None:  # Touched but identical
+                self.scanner.unchanged += 1
+                continue
+            module = SourceModule(path=str(file_path), filename=file_path.name, content=None,
+                                  checksum=checksum, line_count=line_count, language=language,
+                                  size=stats[key].st_size, budget=self.content_budget)
+            analyzed.append((module, findings, cached))
+        return analyzed
+
     def apply_proposal(self, proposal: RewriteProposal, new_content: str) -> bool:
         """
         Apply a rewrite proposal to a source file after running a TypeScript compile check.
 
+        The new content is checked in memory (with every module that imports the file)
+        before anything is written. If tsserver fails the file is written, checked on
+        disk and reverted on failure. Without any TypeScript compiler nothing is
+        applied: this is the last gate before LLM output lands in src/, so unlike
+        RewriteValidator's advisory check it fails closed.
+
         Args:
             proposal: The RewriteProposal to apply.
             new_content: The new file content to write.
@@ -218,11 +1046,17 @@ class ReplicationEngine:
         Returns:
             True if the file was successfully written and compiled. False otherwise.
         """
-        import subprocess
-        target = self.src_root / proposal.target_file
+        target = self.scanner.resolve(proposal.target_file)
 
-        if not target.exists():
-            logger.error(f"Target file does not exist: {target}")
+        if target is None:
+            logger.error(f"Target file not found (or ambiguous): {self.src_root / proposal.target_file}")
+            return False
+
+        # Safety gate: TypeScript compile check, in memory when possible
+        checked = self._overlay_check({str(target): new_content})
+        if checked is not None and not checked[0]:
+            logger.error(f"TypeScript compile check FAILED for {proposal.target_file}. Not applied.")
+            logger.error(f"tsc output:\n{checked[1]}")
             return False
 
         # Backup the original
@@ -233,18 +1067,11 @@ class ReplicationEngine:
         target.write_text(new_content, encoding="utf-8")
         logger.info(f"Wrote new content to {target}")
 
-        # Safety gate: run TypeScript compile check
-        result = subprocess.run(
-            ["npx", "tsc", "--noEmit"],
-            cwd=str(self.project_root),
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
+        ok, output = checked if checked is not None else self._type_check()
 
-        if result.returncode != 0:
+        if not ok:
             logger.error(f"TypeScript compile check FAILED for {proposal.target_file}. Reverting.")
-            logger.error(f"tsc output:\n{result.stdout}\n{result.stderr}")
+            logger.error(f"tsc output:\n{output}")
             # Revert
             target.write_text(backup_path.read_text(encoding="utf-8"), encoding="utf-8")
             backup_path.unlink()
@@ -256,16 +1083,176 @@ class ReplicationEngine:
         logger.info(f"✓ Applied and validated rewrite of {proposal.target_file}")
         return True
 
+    def _type_check(self) -> tuple[bool, str]:
+        """
+        Safety gate: TypeScript compile check of the whole project. Returns (passed, compiler output).
+
+        Without a TypeScript compiler the gate fails closed.
+        """
+        try:
+            return self.typecheck.check_project()
+        except TypeCheckUnavailable as e:
+            return self._compiler_missing(e)
+
+    @staticmethod
+    def _compiler_missing(error: TypeCheckUnavailable) -> tuple[bool, str]:
+        """Verdict of the apply gates without a TypeScript compiler: fail, never apply unchecked code."""
+        logger.error(f"{error} — refusing to apply unchecked changes.")
+        return False, "tsc unavailable"
+
+    def _overlay_check(self, overlays: dict[str, str], files: list[str] | None = None) -> tuple[bool, str] | None:
+        """
+        Type-check proposed contents in memory, together with the modules that import them.
+
+        Returns:
+            (passed, compiler output), or None when tsserver failed and the check has to run on disk.
+            Without a TypeScript compiler the gate fails closed.
+        """
+        try:
+            ok, errors = self.typecheck.check(overlays, files=files, dependents=True)
+        except TypeCheckUnavailable as e:
+            return self._compiler_missing(e)
+        except TypeCheckError as e:
+            logger.warning(f"In-memory type check unavailable ({e}) — checking on disk.")
+            return None
+        return ok, "\n".join(errors)
+
+    def apply_batch(self, changes: list[tuple[RewriteProposal, str]]) -> list[bool]:
+        """
+        Apply several rewrite proposals behind a single compile check.
+
+        All changes are written and checked together. If the build breaks, a binary
+        search over prefixes of the batch finds the change whose addition breaks it;
+        that change is reverted and the rest checked again, until the batch passes.
+        One bad proposal among N costs about log2(N) + 2 compiles instead of N. A pair
+        of changes that only break the build together loses the later one.
+
+        Checks run in memory on the type-check service (covering the changed files and
+        their importers), so the tree is only written once the outcome is known. If
+        tsserver fails each check writes its subset to disk and compiles the project.
+        Without any TypeScript compiler the whole batch is reverted.
+
+        Args:
+            changes: (proposal, new file content) pairs. A second change to a file
+                already in the batch is skipped.
+
+        Returns:
+            Whether each change was applied, in the order given.
+        """
+        results = [False] * len(changes)
+        staged = []  # [index, proposal, target, original, new content]
+        written = []  # Whether each staged file currently holds its new content
+        targets = set()
+        finished = False
+        try:
+            for i, (proposal, new_content) in enumerate(changes):
+                target = self.scanner.resolve(proposal.target_file)
+                if target is None:
+                    logger.error(f"Target file not found (or ambiguous): {self.src_root / proposal.target_file}")
+                    continue
+                if target in targets:
+                    logger.error(f"{proposal.target_file} is already changed in this batch — skipping.")
+                    continue
+                targets.add(target)
+                original = target.read_text(encoding="utf-8")
+                target.with_suffix(target.suffix + ".bak").write_text(original, encoding="utf-8")
+                staged.append((i, proposal, target, original, new_content))
+                written.append(False)
+            if not staged:
+                return results
+
+            compiles = 0
+            in_memory = True  # Until tsserver turns out to be unavailable
+            scope = [str(target) for _, _, target, _, _ in staged]
+
+            def stage(group: list[int]):
+                """Make exactly the changes in `group` present on disk."""
+                wanted = set(group)
+                for n, (_, _, target, original, new_content) in enumerate(staged):
+                    if written[n] != (n in wanted):
+                        target.write_text(new_content if n in wanted else original, encoding="utf-8")
+                        written[n] = n in wanted
+
+            def check(group: list[int]) -> bool:
+                """Compile with exactly the changes in `group` applied."""
+                nonlocal compiles, in_memory
+                compiles += 1
+                result = None
+                if in_memory:
+                    result = self._overlay_check({str(staged[n][2]): staged[n][4] for n in group}, files=scope)
+                    in_memory = result is not None
+                if result is None:
+                    stage(group)
+                    result = self._type_check()
+                ok, output = result
+                if not ok and len(group) == 1:
+                    logger.error(f"TypeScript compile check FAILED for {staged[group[0]][1].target_file}:\n{output}")
+                return ok
+
+            good, bad = list(range(len(staged))), []
+            baseline_ok = None
+            passed = check(good)
+            while not passed:
+                # Invariant: the empty prefix passes, the full `good` list fails
+                lo, hi = 0, len(good)
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if check(good[:mid]):
+                        lo = mid
+                    else:
+                        hi = mid
+                if hi == 1 and baseline_ok is None:
+                    baseline_ok = check([])
+                if baseline_ok is False:
+                    logger.error("The project fails the compile gate even without this batch. Reverting the whole batch.")
+                    bad, good = bad + good, []
+                    break
+                bad.append(good.pop(hi - 1))
+                logger.error(f"TypeScript compile check FAILED with {staged[bad[-1]][1].target_file} applied. Reverting it.")
+                passed = not good or check(good)
+            stage(good)
+            finished = True
+        finally:
+            # On any error (a write, tsc, tsserver) put every staged file back as it was
+            for _, _, target, original, _ in staged:
+                backup = target.with_suffix(target.suffix + ".bak")
+                if not finished:
+                    try:
+                        target.write_text(original, encoding="utf-8")
+                    except OSError as e:
+                        logger.error(f"Could not restore {target} ({e}) — original kept in {backup}.")
+                        continue
+                backup.unlink(missing_ok=True)
+
+        for n, (i, proposal, _, _, _) in enumerate(staged):
+            if n in good:
+                proposal.accepted = True
+                results[i] = True
+        logger.info(f"Batch apply: {len(good)} applied, {len(bad)} reverted, "
+                    f"{len(changes) - len(staged)} skipped — {compiles} compile check(s).")
+        return results
+
     def get_session_report(self, session: ReplicationSession) -> str:
         """Generate a human-readable analysis report."""
         lines = [
             f"=== Self-R Replication Session [{session.session_id}] ===",
             f"Objective: {session.objective}",
-            f"Files Scanned: {len(session.scanned_files)}",
+            f"Files Scanned: {session.total_files}",
+            f"  Changed: {len(session.scanned_files)} ({session.cached_files} analyzed from cache)",
+            f"  Unchanged: {session.unchanged_files} (skipped)",
             f"Proposals Generated: {len(session.proposals)}",
-            "",
-            "── Proposals by Priority ──",
         ]
+        if session.deep_analysis:
+            d = session.deep_analysis
+            lines.append(f"LLM Deep Analysis: {d['audited']} audited, {d['proposals']} proposals, {d['failed']} failed, "
+                         f"{d['skipped']} skipped"
+                         + (f" ({d['stopped_by']} spent)" if d["stopped_by"] else "")
+                         + f", ~{d['tokens_used']} tokens")
+            if d.get("llm_cache"):
+                rates = ", ".join(f"{kind} {v['hit_rate']:.0%} of {v['hits'] + v['misses']}"
+                                  for kind, v in sorted(d["llm_cache"]["kinds"].items()))
+                lines.append(f"LLM Response Cache: {d['llm_cache']['entries']} entries; hit rate {rates or 'n/a'}")
+        lines += ["", "── Proposals by Priority ──"]
 
         for priority in ["critical", "high", "medium", "low"]:
             group = [p for p in session.proposals if p.priority == priority]
@@ -287,23 +1274,81 @@ def main():
     parser.add_argument("--root", default=".", help="Self-R project root directory")
     parser.add_argument("--objective", default="Improve code quality and correctness", help="Analysis objective")
     parser.add_argument("--json", action="store_true", help="Output raw JSON instead of formatted report")
+    parser.add_argument("--full", action="store_true", help="Rescan every file, ignoring the scan manifest")
+    parser.add_argument("--follow-symlinks", action="store_true", help="Descend into symlinked directories (loop-safe)")
+    parser.add_argument("--scan-threads", type=int, default=1, help="Threads used to walk the source tree")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes used to read and analyze changed files")
+    parser.add_argument("--cache-dir", help="Analysis cache directory, shareable between Wagons "
+                                            "(default: $META_CACHE_DIR or <root>/.meta/cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=64, help="Size limit of the analysis cache")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze without the checksum-keyed result cache")
+    parser.add_argument("--content-budget-mb", type=int, default=32,
+                        help="Source content kept in memory during a session (MB, counted in characters)")
+    parser.add_argument("--rules", help="Comma-separated rule ids to run (default: all)")
+    parser.add_argument("--disable-rules", help="Comma-separated rule ids to skip")
+    parser.add_argument("--backend", choices=StaticAnalyzer.BACKENDS, default="token",
+                        help="Static analysis backend (token: lexer/AST predicates, regex: patterns only)")
+    parser.add_argument("--deep", action="store_true", help="Run the LLM deep-analysis phase after static analysis")
+    parser.add_argument("--api-base", default="http://localhost:8080", help="Self-R server used for LLM calls")
+    parser.add_argument("--provider", default="Kimi", help="LLM provider for rewrite proposals")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Files audited concurrently")
+    parser.add_argument("--llm-rate", help="Per-provider call rates, e.g. 'Kimi=0.5,*=2' (calls per second)")
+    parser.add_argument("--token-budget", type=int, help="Stop starting LLM work after ~this many tokens")
+    parser.add_argument("--time-budget", type=float, help="Stop starting LLM work after this many seconds")
+    parser.add_argument("--trace-id", default=os.environ.get("META_TRACE_ID"),
+                        help="Trace ID forwarded on LLM calls (default: $META_TRACE_ID, else a new one)")
+    parser.add_argument("--llm-cache-ttl-hours", type=float, default=168,
+                        help="How long cached LLM audits and rewrites stay valid")
     args = parser.parse_args()
 
-    engine = ReplicationEngine(project_root=args.root)
-    session = engine.run_analysis_session(objective=args.objective)
+    def rule_set(value):
+        return {r.strip() for r in value.split(",") if r.strip()} if value else None
+
+    def rate_limits(value):
+        limits = {}
+        for item in (value or "").split(","):
+            if item.strip():
+                name, _, rate = item.partition("=")
+                try:
+                    limits[name.strip()] = float(rate)
+                except ValueError:
+                    parser.error(f"Invalid --llm-rate entry '{item}' (expected provider=calls_per_second)")
+        return limits
+
+    limits = rate_limits(args.llm_rate)
+    try:
+        engine = ReplicationEngine(project_root=args.root, api_base=args.api_base, follow_symlinks=args.follow_symlinks,
+                                   scan_threads=args.scan_threads,
+                                   enabled_rules=rule_set(args.rules), disabled_rules=rule_set(args.disable_rules),
+                                   backend=args.backend, jobs=args.jobs, use_cache=not args.no_cache,
+                                   cache_dir=args.cache_dir, cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+                                   content_budget=args.content_budget_mb * 1024 * 1024,
+                                   llm_cache_ttl=args.llm_cache_ttl_hours * 3600)
+    except ValueError as e:
+        parser.error(str(e))
+    session = engine.run_analysis_session(objective=args.objective, full=args.full)
+    if args.deep:
+        engine.run_deep_analysis(session, concurrency=args.llm_concurrency, rate_limits=limits,
+                                 provider=args.provider, token_budget=args.token_budget, time_budget=args.time_budget,
+                                 trace_id=args.trace_id)
     report = engine.get_session_report(session)
 
     if args.json:
         output = {
             "session_id": session.session_id,
             "objective": session.objective,
-            "files_scanned": len(session.scanned_files),
+            "files_scanned": session.total_files,
+            "files_changed": len(session.scanned_files),
+            "files_unchanged": session.unchanged_files,
+            "files_cached": session.cached_files,
+            "deep_analysis": session.deep_analysis or None,
             "proposals": [
                 {
                     "target_file": p.target_file,
                     "issue": p.issue_description,
                     "priority": p.priority,
                     "provider": p.provider,
+                    "locations": p.locations,
                 }
                 for p in session.proposals
             ],
@@ -0,0 +1,425 @@
+"""
+Self-R Meta Layer — Token & AST Analysis Backend
+================================================
+Lexer-based backend for the StaticAnalyzer. TypeScript/JavaScript is tokenized
+once in a single linear pass (strings, template literals, regex literals and
+comments are recognised, so rules never match inside them); Python goes through
+`ast`. Rules are token/AST predicates instead of regexes, so long minified lines
+cannot trigger catastrophic backtracking.
+
+Parsed token lists and ASTs are cached per module checksum.
+"""
+
+import ast
+import re
+from collections import OrderedDict
+from typing import Callable
+
+# Bump when a predicate changes, so stored findings (scan manifest) are recomputed.
+VERSION = 2
+
+
+# A token is a plain (kind, value, line, col) tuple — named tuples cost ~15x more to build.
+# kind is "ident" | "num" | "str" | "tmpl" | "regex" | "punct".
+Token = tuple[str, str, int, int]
+KIND, VALUE, LINE, COL = range(4)
+
+
+# Each match is optional indentation plus exactly one token. Template literals and
+# regex literals need context and are scanned by hand (the "special" group).
+_TOKEN_RE = re.compile(r"""
+    [ \t\r\f\v\u00a0\ufeff]*
+    (?:
+        (?P<nl>\n)
+      | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+      | (?P<special>[`/])
+      | (?P<str>"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)
+      | (?P<num>(?:\d|\.\d)[\w.]*)
+      | (?P<ident>[^\W\d][\w$]*|\$[\w$]*)
+      | (?P<punct>\.\.\.|\?\.(?!\d)|=>|\?\?=?|\*\*=?|&&=?|\|\|=?|>>>=?|<<=?|>>=?|[=!]==?|\+\+|--|[-+*%&|^<>]=?|[(){}\[\];,.:?~@#!=])
+      | (?P<other>\S)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+_GROUPS = [None] + sorted(_TOKEN_RE.groupindex, key=_TOKEN_RE.groupindex.get)
+
+_STRING_RE = re.compile(r""""(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?""", re.DOTALL)
+
+# After these identifiers a "/" starts a regex literal rather than a division.
+_REGEX_AFTER_WORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+                      "throw", "case", "do", "else", "yield", "await"}
+
+
+# Inside ${...} interpolations only characters are tracked; a "/" after one of these starts a regex.
+_REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+
+
+def _regex_allowed(prev: Token | None) -> bool:
+    if prev is None:
+        return True
+    if prev[KIND] == "ident":
+        return prev[VALUE] in _REGEX_AFTER_WORDS
+    if prev[KIND] == "punct":
+        return prev[VALUE] not in (")", "]")
+    return False
+
+
+def _scan_regex(src: str, i: int) -> int | None:
+    """End of the regex literal starting at src[i] == "/", or None if it isn't one."""
+    n, in_class = len(src), False
+    i += 1
+    while i < n:
+        c = src[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return None
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "/":
+            i += 1
+            while i < n and (src[i].isalnum() or src[i] in "_$"):
+                i += 1
+            return i
+        i += 1
+    return None
+
+
+def _scan_template(src: str, i: int) -> int:
+    """End of the template literal starting at src[i] == "`", skipping ${...} interpolations."""
+    n = len(src)
+    i += 1
+    while i < n:
+        c = src[i]
+        if c == "\\":
+            i += 2
+        elif c == "`":
+            return i + 1
+        elif c == "$" and src.startswith("${", i):
+            i = _scan_interpolation(src, i + 2)
+        else:
+            i += 1
+    return n
+
+
+def _scan_interpolation(src: str, i: int) -> int:
+    """End (after the closing brace) of a ${...} interpolation whose body starts at src[i]."""
+    n, depth, last = len(src), 1, "{"  # last: previous significant character
+    while i < n:
+        c = src[i]
+        if c in "\"'":
+            i, last = _STRING_RE.match(src, i).end(), c
+            continue
+        if c == "`":
+            i, last = _scan_template(src, i), c
+            continue
+        if c == "/" and src.startswith("//", i):
+            end = src.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if c == "/" and src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        if c == "/" and last in _REGEX_AFTER_CHARS:
+            end = _scan_regex(src, i)
+            if end is not None:
+                i, last = end, "/"
+                continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        if not c.isspace():
+            last = c
+        i += 1
+    return n
+
+
+def tokenize(src: str) -> list[Token]:
+    """Tokenize TypeScript/JavaScript source. Comments and whitespace are dropped."""
+    tokens: list[Token] = []
+    append = tokens.append
+    groups = _GROUPS
+    n, pos, line, line_start = len(src), 0, 1, 0
+    prev: Token | None = None
+    while pos < n:
+        restart = None
+        for m in _TOKEN_RE.finditer(src, pos):
+            index = m.lastindex
+            kind = groups[index]
+            if kind == "nl":
+                line += 1
+                line_start = m.end()
+                continue
+            start, end = m.start(index), m.end()
+            if kind == "special":
+                if src[start] == "`":
+                    end, kind = _scan_template(src, start), "tmpl"
+                else:
+                    regex_end = _scan_regex(src, start) if _regex_allowed(prev) else None
+                    if regex_end is None:
+                        kind = "punct"
+                        end = start + 2 if src.startswith("/=", start) else start + 1
+                    else:
+                        end, kind = regex_end, "regex"
+                restart = end
+            elif kind == "other":
+                kind = "punct"
+            if kind != "comment":
+                prev = (kind, src[start:end], line, start - line_start + 1)
+                append(prev)
+            if kind == "comment" or kind == "str" or kind == "tmpl":
+                newlines = src.count("\n", start, end)
+                if newlines:
+                    line += newlines
+                    line_start = src.rfind("\n", start, end) + 1
+            if restart is not None:
+                break
+        else:
+            break
+        if restart is not None:
+            pos = restart
+    return tokens
+
+
+class TokenStream:
+    """
+    Tokens plus the lookups predicates need, built in one linear pass:
+    matching bracket indexes and token value → positions.
+    """
+
+    __slots__ = ("tokens", "match", "by_value")
+
+    _OPENERS = {")": "(", "]": "[", "}": "{"}
+
+    def __init__(self, tokens: list[Token]):
+        n = len(tokens)
+        self.tokens = tokens
+        self.match = match = [n] * n  # Unmatched brackets point past the end
+        self.by_value: dict[str, list[int]] = {}
+        stack: list[int] = []
+        for i, (kind, value, _, _) in enumerate(tokens):
+            if kind == "str" or kind == "tmpl" or kind == "regex" or kind == "num":
+                continue
+            self.by_value.setdefault(value, []).append(i)
+            if kind == "punct":
+                if value in ("(", "[", "{"):
+                    stack.append(i)
+                elif value in self._OPENERS and stack and tokens[stack[-1]][VALUE] == self._OPENERS[value]:
+                    opener = stack.pop()
+                    match[opener], match[i] = i, opener
+
+    def positions(self, value: str) -> list[int]:
+        return self.by_value.get(value, [])
+
+
+# ─── TypeScript / JavaScript predicates ─────────────────────────────────────────
+# Each takes the token list and returns (line, col) hits.
+
+_STATEMENT_HEADS = {"if", "for", "while"}
+_NOT_AN_EXPRESSION = {
+    "await", "return", "const", "let", "var", "throw", "yield", "void", "new", "typeof", "delete",
+    "import", "export", "if", "for", "while", "switch", "case", "do", "else", "function", "class",
+    "interface", "type", "enum", "try", "catch", "finally", "break", "continue", "default",
+    "declare", "namespace", "module", "abstract", "private", "public", "protected", "static",
+    "readonly", "async",
+}
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+
+
+def _opens_statement(ts: TokenStream, i: int) -> bool:
+    """True if tokens[i] is the first token of a statement."""
+    if i == 0:
+        return True
+    kind, value, _, _ = ts.tokens[i - 1]
+    if kind == "ident":
+        return value == "else"
+    if kind != "punct":
+        return False
+    if value in (";", "{", "}"):
+        return True
+    if value == ")":  # `if (...) stmt;`
+        opener = ts.match[i - 1]
+        return 0 < opener < i - 1 and ts.tokens[opener - 1][VALUE] in _STATEMENT_HEADS
+    return False
+
+
+def ts_unhandled_promise(ts: TokenStream) -> list[tuple[int, int]]:
+    """
+    Expression statements that are a bare method-call chain — the result is neither
+    awaited, returned, assigned nor ended with .catch().
+
+    Flagged: `api.send(x);`, `this.save();`, `this.client.connect();`, `super.init();`
+    Not flagged: `await this.save();`, `this.save().catch(log);`, `super(props);`, `save();`
+    """
+    tokens, match = ts.tokens, ts.match
+    n = len(tokens)
+    candidates = set()
+    for boundary in (";", "{", "}", ")", "else"):
+        candidates.update(i + 1 for i in ts.positions(boundary) if i + 1 < n)
+    if n:
+        candidates.add(0)
+    hits = []
+    for i in sorted(candidates):
+        kind, value, line, col = tokens[i]
+        if kind != "ident" or value in _NOT_AN_EXPRESSION or value == "console" or not _opens_statement(ts, i):
+            continue
+        j, member_call, last_member = i + 1, False, None
+        while j < n and tokens[j][KIND] == "punct":
+            v = tokens[j][VALUE]
+            if (v == "." or v == "?.") and j + 1 < n and tokens[j + 1][KIND] == "ident":
+                last_member = tokens[j + 1][VALUE]
+                j += 2
+                if j < n and tokens[j][VALUE] == "(" and tokens[j][KIND] == "punct":
+                    member_call = True
+            elif v == "(" or v == "[":
+                j = match[j] + 1
+            elif v == "!":
+                j += 1
+            else:
+                break
+        if (member_call and last_member != "catch" and j < n
+                and tokens[j][VALUE] == ";" and tokens[j - 1][VALUE] == ")"):
+            hits.append((line, col))
+    return hits
+
+
+def _follows(ts: TokenStream, i: int, values: tuple) -> bool:
+    """True if the tokens after position i have exactly these values (a set matches any member)."""
+    tokens = ts.tokens
+    if i + len(values) >= len(tokens):
+        return False
+    for offset, expected in enumerate(values, 1):
+        actual = tokens[i + offset][VALUE]
+        matched = actual in expected if isinstance(expected, set) else actual == expected
+        if not matched:
+            return False
+    return True
+
+
+def ts_error_return_string(ts: TokenStream) -> list[tuple[int, int]]:
+    """`return chalk.red(...)` / `return chalk.yellow(...)`."""
+    return [ts.tokens[i][LINE:] for i in ts.positions("return")
+            if _follows(ts, i, ("chalk", ".", {"red", "yellow"}, "("))]
+
+
+def ts_any_type(ts: TokenStream) -> list[tuple[int, int]]:
+    """Type annotations of `any` (`x: any`, `): any`, `: any[]`)."""
+    return [ts.tokens[i - 1][LINE:] for i in ts.positions("any")
+            if i > 0 and ts.tokens[i][KIND] == "ident" and ts.tokens[i - 1][VALUE] == ":"]
+
+
+def ts_console_log(ts: TokenStream) -> list[tuple[int, int]]:
+    """Calls to console.log(...)."""
+    return [ts.tokens[i][LINE:] for i in ts.positions("console")
+            if ts.tokens[i][KIND] == "ident" and _follows(ts, i, (".", "log", "("))]
+
+
+# ─── Python predicates ──────────────────────────────────────────────────────────
+
+def py_unhandled_promise(tree: ast.AST) -> list[tuple[int, int]]:
+    """Calls to async functions/methods of this module used as bare statements (never awaited)."""
+    async_names = {node.name for node in ast.walk(tree) if isinstance(node, ast.AsyncFunctionDef)}
+    hits = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            func = node.value.func
+            name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+            if name in async_names:
+                hits.append((node.lineno, node.col_offset + 1))
+    return hits
+
+
+def py_any_type(tree: ast.AST) -> list[tuple[int, int]]:
+    """`Any` / `typing.Any` used in argument, return or variable annotations."""
+    annotations = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.arg) and node.annotation is not None:
+            annotations.append(node.annotation)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.returns is not None:
+            annotations.append(node.returns)
+        elif isinstance(node, ast.AnnAssign):
+            annotations.append(node.annotation)
+    hits = []
+    for annotation in annotations:
+        for sub in ast.walk(annotation):
+            if (isinstance(sub, ast.Name) and sub.id == "Any") or (isinstance(sub, ast.Attribute) and sub.attr == "Any"):
+                hits.append((sub.lineno, sub.col_offset + 1))
+    return hits
+
+
+# Rule id → predicate, per language. A rule listed for one language but not the other
+# does not apply to the other (console.log means nothing in Python). Rules in neither
+# map fall back to their regex.
+TS_PREDICATES: dict[str, Callable[[TokenStream], list[tuple[int, int]]]] = {
+    "unhandled-promise": ts_unhandled_promise,
+    "error-return-string": ts_error_return_string,
+    "any-type": ts_any_type,
+    "console-log-in-prod": ts_console_log,
+}
+PY_PREDICATES: dict[str, Callable[[ast.AST], list[tuple[int, int]]]] = {
+    "unhandled-promise": py_unhandled_promise,
+    "any-type": py_any_type,
+}
+NATIVE_RULES = set(TS_PREDICATES) | set(PY_PREDICATES)
+
+
+class ParseCache:
+    """
+    LRU of TokenStreams / ASTs keyed by (language, checksum).
+
+    Bounded both by entry count and by the total size of the parsed sources, since a
+    token stream takes many times the memory of its source text.
+    """
+
+    def __init__(self, maxsize: int = 256, max_chars: int = 512 * 1024):
+        self.maxsize = maxsize
+        self.max_chars = max_chars
+        self.chars = 0
+        self._entries: "OrderedDict[tuple[str, str], tuple[object, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, language: str, checksum: str, content: str):
+        key = (language, checksum)
+        if checksum and key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+        self.misses += 1
+        parsed = ast.parse(content) if language == "python" else TokenStream(tokenize(content))
+        if checksum and len(content) <= self.max_chars:
+            self._entries[key] = (parsed, len(content))
+            self.chars += len(content)
+            while len(self._entries) > self.maxsize or self.chars > self.max_chars:
+                self.chars -= self._entries.popitem(last=False)[1][1]
+        return parsed
+
+    def clear(self):
+        self._entries.clear()
+        self.chars = 0
+
+
+parse_cache = ParseCache()
+
+
+def find(language: str, content: str, checksum: str, rule_ids: list[str]) -> dict[str, list[tuple[int, int]]] | None:
+    """
+    Run the native predicates for `rule_ids` (those in NATIVE_RULES) over a module.
+
+    Returns rule id → hits, or None if the module could not be parsed (the caller
+    should fall back to regex rules).
+    """
+    predicates = PY_PREDICATES if language == "python" else TS_PREDICATES
+    try:
+        parsed = parse_cache.get(language, checksum, content)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    return {rule_id: predicates[rule_id](parsed) if rule_id in predicates else []
+            for rule_id in rule_ids if rule_id in NATIVE_RULES}
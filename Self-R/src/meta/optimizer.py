@@ -6,22 +6,209 @@ to generate deep, context-aware rewrite proposals for source modules identified
 by the StaticAnalyzer or submitted manually.
 """
 
+import asyncio
+import http.client
 import json
 import logging
-import urllib.request
-import urllib.error
+import queue
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from cache import LLMResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Tracing headers shared with the Ringmaster hub (see Ringmaster/tracing.py).
+TRACE_HEADER = "X-Trace-Id"
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+# Bump when a server-side prompt or response shape changes, so cached responses are not reused
+AUDIT_VERSION = "quality_audit-1"
+REWRITE_VERSION = "rewrite-1"
+AUDIT_PROVIDER = "Kimi"  # /api/analyze always routes through this provider
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ServerError(Exception):
+    """Non-2xx response from the Self-R server (after retries)."""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to one server, shared between threads.
+
+    A request takes an idle connection (or opens one), and returns it afterwards
+    unless the server asked to close it. Up to `size` idle connections are kept.
+    """
+
+    def __init__(self, base_url: str, size: int = 8):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.prefix = parts.path.rstrip("/")
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=size)
+        self.opened = 0
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        self.opened += 1
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: bytes, headers: dict, timeout: float) -> tuple[int, dict, bytes]:
+        """Send one request. A reused connection the server has since closed is replaced transparently."""
+        try:
+            conn, reused = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._connect(timeout), False
+        while True:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                conn, reused = self._connect(timeout), False  # Idle connection timed out server-side
+            except Exception:
+                conn.close()
+                raise
+        if resp.will_close:
+            conn.close()
+        else:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return resp.status, dict(resp.getheaders()), data
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
 
 class LLMOptimizer:
     """
     Generates LLM-powered rewrite proposals by calling the running Self-R server's
     /api/rewrite endpoint, which in turn routes through the TypeScript LLMFactory.
+
+    Every call forwards a trace ID (the caller's, e.g. `core.py --trace-id`, or a
+    fresh one) and the remaining deadline, so the Wagon can drop work whose deadline
+    has passed. The Wagon only echoes the trace ID: these calls are not recorded as
+    spans in the Ringmaster trace. Calls made after the deadline has passed are
+    dropped without touching the network.
+    With a response cache, audits and rewrites already answered for the same content
+    (and issue, provider and prompt version) are returned without a network call.
+
+    Calls share a pool of keep-alive connections. 429 and 5xx responses (and
+    connection failures) are retried with jittered exponential backoff, never past
+    the deadline. The *_async methods run the same calls on a thread pool sized to
+    the connection pool.
     """
 
-    def __init__(self, server_url: str = "http://localhost:8080"):
+    def __init__(self, server_url: str = "http://localhost:8080", trace_id: str | None = None,
+                 deadline: float | None = None, cache: LLMResponseCache | None = None,
+                 rewrite_timeout: float = 120, audit_timeout: float = 60, retries: int = 3,
+                 backoff: float = 0.5, max_connections: int = 8):
+        """
+        Args:
+            server_url: Base URL of the running Self-R server.
+            trace_id: Trace ID to forward. A new one is generated when omitted.
+            deadline: Absolute deadline (time.time()) for all calls made by this optimizer.
+            cache: LLM response cache consulted before every call (see cache.py).
+            rewrite_timeout: Per-attempt timeout of /api/rewrite calls, in seconds.
+            audit_timeout: Per-attempt timeout of /api/analyze calls, in seconds.
+            retries: Extra attempts after a 429/5xx response or a connection failure.
+            backoff: Base delay of the exponential backoff, in seconds.
+            max_connections: Idle keep-alive connections kept, and threads used by the async methods.
+        """
         self.server_url = server_url.rstrip("/")
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.deadline = deadline
+        self.cache = cache
+        self.rewrite_timeout = rewrite_timeout
+        self.audit_timeout = audit_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.pool = ConnectionPool(self.server_url, size=max_connections)
+        self._executor: ThreadPoolExecutor | None = None
+        self._batch_supported: bool | None = None  # Learned from the first batch call
+
+    def _remaining(self) -> float | None:
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def _headers(self) -> dict:
+        headers = {"Content-Type": "application/json", TRACE_HEADER: self.trace_id}
+        remaining = self._remaining()
+        if remaining is not None:
+            headers[DEADLINE_HEADER] = str(max(0, int(remaining * 1000)))
+        return headers
+
+    def _timeout(self, default: float) -> float | None:
+        """Clamp a call timeout to the remaining deadline. Returns None if the deadline has passed."""
+        remaining = self._remaining()
+        if remaining is None:
+            return default
+        if remaining <= 0:
+            return None
+        return min(default, remaining)
+
+    def _post(self, path: str, payload: dict, timeout: float):
+        """
+        POST JSON and decode the JSON reply, retrying 429/5xx and connection failures.
+
+        Raises TimeoutError once the deadline has passed, ServerError for other
+        non-2xx replies or when retries are exhausted.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        attempt = 0
+        while True:
+            call_timeout = self._timeout(timeout)
+            if call_timeout is None:
+                raise TimeoutError("Deadline exceeded")
+            retry_after = None
+            try:
+                status, headers, data = self.pool.request("POST", path, body, self._headers(), call_timeout)
+                if 200 <= status < 300:
+                    return json.loads(data.decode("utf-8"))
+                error = ServerError(status, data.decode("utf-8", "replace"))
+                if status not in RETRY_STATUSES:
+                    raise error
+                retry_after = headers.get("Retry-After") or headers.get("retry-after")
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if attempt >= self.retries:
+                raise error
+            # Full jitter keeps concurrent callers from retrying in lockstep
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            remaining = self._remaining()
+            if remaining is not None and delay >= remaining:
+                raise error
+            attempt += 1
+            logger.warning(f"LLMOptimizer: {path} failed ({error}); retry {attempt}/{self.retries} in {delay:.2f}s")
+            time.sleep(delay)
 
     def propose_rewrite(self, filename: str, content: str, issue: str, provider: str = "Kimi") -> str | None:
         """
@@ -36,30 +223,45 @@ class LLMOptimizer:
         Returns:
             The proposed new file content as a string, or None on failure.
         """
-        payload = json.dumps({
-            "filename": filename,
-            "content": content,
-            "issue": issue,
-            "provider": provider,
-        }).encode("utf-8")
-
-        req = urllib.request.Request(
-            f"{self.server_url}/api/rewrite",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-
-        try:
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
-                return data.get("proposed_content")
-        except urllib.error.URLError as e:
-            logger.error(f"LLMOptimizer: Server request failed: {e}")
+        key = LLMResponseCache.key("rewrite", REWRITE_VERSION, provider, issue, content)
+        if self.cache is not None:
+            cached = self.cache.get("rewrite", key)
+            if cached is not None:
+                return cached
+        if self._timeout(self.rewrite_timeout) is None:
+            logger.warning(f"LLMOptimizer: Deadline exceeded — dropping rewrite of {filename}.")
             return None
+        try:
+            data = self._post("/api/rewrite", {
+                "filename": filename,
+                "content": content,
+                "issue": issue,
+                "provider": provider,
+            }, self.rewrite_timeout)
         except json.JSONDecodeError as e:
             logger.error(f"LLMOptimizer: Invalid JSON response: {e}")
             return None
+        except Exception as e:
+            logger.error(f"LLMOptimizer: Server request failed: {e}")
+            return None
+        proposed = data.get("proposed_content") if isinstance(data, dict) else None
+        if proposed and self.cache is not None:
+            self.cache.put("rewrite", key, proposed)
+        return proposed
+
+    def _cached_audit(self, content: str) -> tuple[str, dict | None]:
+        key = LLMResponseCache.key("audit", AUDIT_VERSION, AUDIT_PROVIDER, "quality_audit", content)
+        return key, self.cache.get("audit", key) if self.cache is not None else None
+
+    def _store_audit(self, key: str, audit):
+        # Error payloads and unparsable LLM output are not worth remembering
+        if (self.cache is not None and isinstance(audit, dict) and isinstance(audit.get("score"), (int, float))
+                and not audit.get("error") and audit.get("issues") != ["Parse failed"]):
+            self.cache.put("audit", key, audit)
+
+    @staticmethod
+    def _failed_audit(error: str) -> dict:
+        return {"score": 0, "issues": [error], "suggestions": [], "error": error}
 
     def analyze_module_quality(self, filename: str, content: str) -> dict:
         """
@@ -71,23 +273,90 @@ class LLMOptimizer:
 
         Returns:
             A dict with 'score' (0-10), 'issues' (list[str]), and 'suggestions' (list[str]).
+            Failed audits also carry 'error'. Only successful audits are cached.
         """
-        payload = json.dumps({
-            "filename": filename,
-            "content": content,
-            "mode": "quality_audit",
-        }).encode("utf-8")
-
-        req = urllib.request.Request(
-            f"{self.server_url}/api/analyze",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
+        key, cached = self._cached_audit(content)
+        if cached is not None:
+            return cached
+        return self._audit(filename, content, key)
 
+    def _audit(self, filename: str, content: str, key: str) -> dict:
+        if self._timeout(self.audit_timeout) is None:
+            logger.warning(f"LLMOptimizer: Deadline exceeded — dropping quality audit of {filename}.")
+            return self._failed_audit("Deadline exceeded")
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                return json.loads(resp.read().decode("utf-8"))
+            audit = self._post("/api/analyze", {
+                "filename": filename,
+                "content": content,
+                "mode": "quality_audit",
+            }, self.audit_timeout)
         except Exception as e:
             logger.error(f"LLMOptimizer: Quality audit failed: {e}")
-            return {"score": 0, "issues": [str(e)], "suggestions": []}
\ No newline at end of file
+            return self._failed_audit(str(e))
+        self._store_audit(key, audit)
+        return audit
+
+    def analyze_batch(self, files: list[tuple[str, str]]) -> list[dict]:
+        """
+        Audit several (filename, content) pairs, one result per file in the same order.
+
+        Cached audits are answered locally; the rest go to /api/analyze in a single
+        request ({"files": [...]}). Servers without batch support are detected on the
+        first call and get one request per file from then on.
+        """
+        results: list[dict | None] = []
+        pending = []
+        for i, (filename, content) in enumerate(files):
+            key, cached = self._cached_audit(content)
+            results.append(cached)
+            if cached is None:
+                pending.append((i, key, filename, content))
+        if not pending:
+            return results
+
+        if self._batch_supported is not False and len(pending) > 1:
+            try:
+                data = self._post("/api/analyze", {
+                    "files": [{"filename": f, "content": c} for _, _, f, c in pending],
+                    "mode": "quality_audit",
+                }, self.audit_timeout)
+            except Exception as e:
+                if not (isinstance(e, ServerError) and e.status == 400):
+                    logger.error(f"LLMOptimizer: Batch quality audit failed: {e}")
+                    return [r if r is not None else self._failed_audit(str(e)) for r in results]
+                data = None  # Single-file server: "filename and content are required"
+            batch = data.get("results") if isinstance(data, dict) else None
+            self._batch_supported = isinstance(batch, list) and len(batch) == len(pending)
+            if self._batch_supported:
+                for (i, key, _, _), audit in zip(pending, batch):
+                    self._store_audit(key, audit)
+                    results[i] = audit
+                return results
+            logger.info("LLMOptimizer: Server has no batch /api/analyze — auditing files one by one.")
+
+        for i, key, filename, content in pending:
+            results[i] = self._audit(filename, content, key)
+        return results
+
+    # ── Async API ──
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="llm-optimizer")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def propose_rewrite_async(self, filename: str, content: str, issue: str, provider: str = "Kimi") -> str | None:
+        return await self._run(self.propose_rewrite, filename, content, issue, provider)
+
+    async def analyze_module_quality_async(self, filename: str, content: str) -> dict:
+        return await self._run(self.analyze_module_quality, filename, content)
+
+    async def analyze_batch_async(self, files: list[tuple[str, str]]) -> list[dict]:
+        return await self._run(self.analyze_batch, files)
+
+    def close(self):
+        """Close pooled connections and the async worker threads."""
+        self.pool.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,341 @@
+"""
+Self-R Meta Layer — Persistent Type-Check Service
+==================================================
+Keeps the TypeScript compiler warm between safety gates instead of starting
+`npx tsc` from cold (npx resolution, compiler startup, full parse) for every check.
+
+TypeCheckService manages two compiler processes:
+    * A tsserver session holding the project's program in memory. check() sends
+      in-memory (overlay) contents for the edited files and returns their
+      diagnostics, then drops the overlays so the program matches the disk again.
+      Single-file checks on a warm program take well under a second, and the
+      source tree is never written, so checks cannot interfere with each other.
+    * `tsc --noEmit --incremental` with a persistent .tsbuildinfo for
+      whole-project checks of what is on disk (check_project()). Files whose
+      inputs did not change are not checked again.
+
+The compiler is taken from the project's node_modules when present, so npx is
+only used as a fallback. tsserver exits by itself when its stdin closes, so a
+service that is never closed does not outlive the Python process.
+"""
+
+import json
+import logging
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class TypeCheckUnavailable(Exception):
+    """No TypeScript compiler could be found for the project."""
+
+
+class TypeCheckError(Exception):
+    """The tsserver session failed, exited or did not answer in time."""
+
+
+class TypeCheckService:
+    """
+    Long-lived type checker for one TypeScript project, safe to share between threads.
+
+    tsserver starts on the first check() and keeps one project file open so the
+    program stays loaded. Overlay checks are serialized: overlays are server-wide
+    state, and each check is short once the program is warm.
+    """
+
+    TSBUILDINFO = ".meta/tsc.tsbuildinfo"
+
+    def __init__(self, project_root: str, tsbuildinfo: str | None = None, timeout: float = 60.0):
+        self.project_root = Path(project_root).resolve()
+        self.tsbuildinfo = Path(tsbuildinfo) if tsbuildinfo else self.project_root / self.TSBUILDINFO
+        self.timeout = timeout
+        self._proc: subprocess.Popen | None = None
+        self._pending: dict[int, Future] = {}
+        self._seq = 0
+        self._anchor: str | None = None  # Project file kept open so tsserver keeps the program loaded
+        self._io_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self.stats = {"checks": 0, "project_checks": 0, "starts": 0, "check_seconds": 0.0}
+
+    # ─── Compiler Processes ───────────────────────────────────────────────────
+
+    def _command(self, tool: str) -> list[str]:
+        """Command line for `tsc` or `tsserver`, preferring the project's own TypeScript."""
+        local = self.project_root / "node_modules" / "typescript" / "lib" / f"{tool}.js"
+        node = shutil.which("node")
+        if node and local.exists():
+            return [node, str(local)]
+        npx = shutil.which("npx")
+        if npx:
+            return [npx, tool]
+        raise TypeCheckUnavailable(f"{tool} not found — install typescript in {self.project_root}")
+
+    def _path(self, name: str) -> str:
+        path = Path(name)
+        return str(path if path.is_absolute() else self.project_root / path)
+
+    def _find_anchor(self) -> str | None:
+        for directory in ("src", "bin", "."):
+            for path in sorted((self.project_root / directory).glob("**/*.ts")):
+                if "node_modules" not in path.parts and not path.name.endswith(".d.ts"):
+                    return str(path)
+        return None
+
+    def start(self):
+        """Start tsserver and load the project, unless it is already running."""
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        cmd = self._command("tsserver") + ["--disableAutomaticTypingAcquisition", "--suppressDiagnosticEvents"]
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, cwd=str(self.project_root), stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        pending: dict[int, Future] = {}
+        with self._io_lock:
+            self._proc, self._pending = proc, pending
+        threading.Thread(target=self._read_loop, args=(proc, pending), daemon=True, name="tsserver-reader").start()
+        self.stats["starts"] += 1
+        self._anchor = self._find_anchor()
+        if self._anchor is not None:
+            self._request("updateOpen", {"openFiles": [self._open_args(self._anchor)]})
+        logger.info(f"tsserver ready in {time.monotonic() - started:.1f}s (pid {proc.pid}).")
+
+    def _read_loop(self, proc: subprocess.Popen, pending: dict[int, Future]):
+        """Route tsserver responses (Content-Length framed JSON) to the requests waiting for them."""
+        stream = proc.stdout
+        while True:
+            header = stream.readline()
+            if not header:
+                break
+            if not header.startswith(b"Content-Length:"):
+                continue
+            length = int(header.split(b":", 1)[1])
+            stream.readline()  # Blank line after the header
+            try:
+                message = json.loads(stream.read(length))
+            except ValueError:
+                continue
+            if message.get("type") != "response":
+                continue  # Events
+            with self._io_lock:
+                future = pending.pop(message.get("request_seq"), None)
+            if future is not None:
+                future.set_result(message)
+        with self._io_lock:
+            waiting = list(pending.values())
+            pending.clear()
+        for future in waiting:
+            future.set_exception(TypeCheckError(f"tsserver exited (code {proc.wait()})"))
+
+    def _request(self, command: str, arguments: dict):
+        """Send a request and wait for its response body."""
+        future: Future = Future()
+        with self._io_lock:
+            if self._proc is None or self._proc.poll() is not None:
+                raise TypeCheckError("tsserver is not running")
+            self._seq += 1
+            self._pending[self._seq] = future
+            request = {"seq": self._seq, "type": "request", "command": command, "arguments": arguments}
+            try:
+                self._proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._pending.pop(self._seq, None)
+                raise TypeCheckError(f"tsserver is not accepting requests: {e}") from e
+        try:
+            response = future.result(self.timeout)
+        except FutureTimeout:
+            raise TypeCheckError(f"tsserver did not answer '{command}' within {self.timeout}s") from None
+        if not response.get("success"):
+            raise TypeCheckError(f"tsserver '{command}' failed: {response.get('message')}")
+        return response.get("body")
+
+    def _open_args(self, path: str, content: str | None = None) -> dict:
+        args = {"file": path, "projectRootPath": str(self.project_root)}
+        if content is not None:
+            args["fileContent"] = content
+        return args
+
+    def close(self):
+        """Stop tsserver. The next check() starts it again."""
+        with self._io_lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Checks ────────────────────────────────────────────────────────────────
+
+    def _format(self, path: str, diagnostic: dict) -> str:
+        try:
+            name = str(Path(path).relative_to(self.project_root))
+        except ValueError:
+            name = path
+        start = diagnostic.get("start") or {}
+        return (f"{name}({start.get('line', 0)},{start.get('offset', 0)}): "
+                f"{diagnostic.get('category', 'error')} TS{diagnostic.get('code', 0)}: {diagnostic.get('text', '')}")
+
+    def check(self, overlays: dict[str, str], files: list[str] | None = None,
+              dependents: bool = False) -> tuple[bool, list[str]]:
+        """
+        Type-check against in-memory file contents, without touching the disk.
+
+        Returns:
+            (no errors, error diagnostics formatted like tsc output)
+
+        See diagnostics() for the arguments and exceptions.
+        """
+        errors = [error for file_errors in self.diagnostics(overlays, files, dependents).values()
+                  for error in file_errors]
+        return not errors, errors
+
+    def diagnostics(self, overlays: dict[str, str], files: list[str] | None = None,
+                    dependents: bool = False) -> dict[str, list[str]]:
+        """
+        Error diagnostics per checked file, against in-memory file contents.
+
+        Args:
+            overlays: Path (absolute or project-relative) → content to check in place of the file on disk.
+                Paths that do not exist yet are checked as new files.
+            files: Files whose diagnostics are reported (default: the overlaid files).
+            dependents: Also report the files that import those, directly or transitively
+                (the dependency cone an edit can break).
+
+        Returns:
+            Absolute path → error diagnostics formatted like tsc output (empty when clean),
+            for every checked file.
+
+        Raises:
+            TypeCheckUnavailable: No compiler was found.
+            TypeCheckError: tsserver failed twice in a row (it is restarted once).
+        """
+        contents = {self._path(name): content for name, content in overlays.items()}
+        targets = [self._path(name) for name in files] if files else list(contents)
+        started = time.monotonic()
+        with self._check_lock:
+            for attempt in (1, 2):
+                try:
+                    self.start()
+                    result = self._check(contents, targets, dependents)
+                    break
+                except TypeCheckError as e:
+                    if attempt == 2:
+                        raise
+                    logger.warning(f"{e} — restarting tsserver.")
+                    self.close()
+        self.stats["checks"] += 1
+        self.stats["check_seconds"] += time.monotonic() - started
+        return result
+
+    def _dependents(self, paths: list[str]) -> list[str]:
+        """Files importing any of `paths`, transitively, per tsserver's fileReferences on the current program."""
+        seen, queue, found = set(paths), list(paths), []
+        while queue:
+            body = self._request("fileReferences", {"file": queue.pop()}) or {}
+            for ref in body.get("refs", []):
+                if ref["file"] not in seen:
+                    seen.add(ref["file"])
+                    found.append(ref["file"])
+                    queue.append(ref["file"])
+        return found
+
+    def _check(self, contents: dict[str, str], targets: list[str], dependents: bool) -> dict[str, list[str]]:
+        if self._anchor is not None:
+            # Open files are not watched on disk, so pick up any change since the last check
+            self._request("reload", {"file": self._anchor, "tmpfile": self._anchor})
+        opened = [self._open_args(path, contents.get(path)) for path in dict.fromkeys([*contents, *targets])]
+        self._request("updateOpen", {"openFiles": opened})
+        try:
+            if dependents:
+                cone = self._dependents([path for path in targets if Path(path).exists()])
+                cone = [path for path in cone if path not in targets]
+                if cone:
+                    opened += [self._open_args(path) for path in cone]
+                    self._request("updateOpen", {"openFiles": [self._open_args(path) for path in cone]})
+                    targets = targets + cone
+            errors = {}
+            for path in targets:
+                errors[path] = []
+                for command in ("syntacticDiagnosticsSync", "semanticDiagnosticsSync"):
+                    for diagnostic in self._request(command, {"file": path}) or []:
+                        if diagnostic.get("category", "error") == "error":
+                            errors[path].append(self._format(path, diagnostic))
+            return errors
+        finally:
+            closed = [args["file"] for args in opened if args["file"] != self._anchor]
+            if closed:
+                self._request("updateOpen", {"closedFiles": closed})
+            if self._anchor in contents:
+                self._request("reload", {"file": self._anchor, "tmpfile": self._anchor})
+
+    def check_project(self) -> tuple[bool, str]:
+        """
+        Incremental whole-project check of the files on disk (`tsc --noEmit --incremental`).
+
+        Returns:
+            (compiled cleanly, compiler output)
+
+        Raises:
+            TypeCheckUnavailable: No compiler was found.
+        """
+        cmd = self._command("tsc") + ["--noEmit", "--incremental", "--tsBuildInfoFile", str(self.tsbuildinfo)]
+        self.tsbuildinfo.parent.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+        try:
+            result = subprocess.run(cmd, cwd=str(self.project_root), capture_output=True, text=True,
+                                    timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            return False, f"tsc timed out after {self.timeout:.0f}s"
+        finally:
+            self.stats["project_checks"] += 1
+            self.stats["check_seconds"] += time.monotonic() - started
+        return result.returncode == 0, f"{result.stdout}{result.stderr}"
+
+
+# ─── CLI Entry Point ───────────────────────────────────────────────────────────
+
+def main():
+    """Type-check files (or the whole project) and report timings."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Self-R Meta Layer: Type-Check Service")
+    parser.add_argument("--root", default=".", help="Self-R project root directory")
+    parser.add_argument("--project", action="store_true", help="Incremental whole-project check instead of tsserver")
+    parser.add_argument("--repeat", type=int, default=1, help="Check the files this many times on one warm session")
+    parser.add_argument("files", nargs="*", help="Files to check through tsserver")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    with TypeCheckService(args.root) as service:
+        try:
+            if args.project or not args.files:
+                ok, output = service.check_project()
+                print(output.strip() or "No errors.")
+            else:
+                for n in range(args.repeat):
+                    started = time.monotonic()
+                    ok, errors = service.check({}, files=args.files)
+                    print(f"check {n + 1}: {'ok' if ok else f'{len(errors)} error(s)'} "
+                          f"in {time.monotonic() - started:.3f}s")
+                print("\n".join(errors) or "No errors.")
+        except (TypeCheckUnavailable, TypeCheckError) as e:
+            parser.exit(2, f"{e}\n")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
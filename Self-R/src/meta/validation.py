@@ -3,24 +3,65 @@ Self-R Meta Layer — Rewrite Validation & Safety Gates
 =====================================================
 Phase 3 safety: Validates proposed code rewrites before they are applied to the
 Self-R source directory. Ensures the swarm cannot accidentally break itself.
+
+`python3 validation.py --serve` runs a long-lived validation worker that answers
+JSON-line requests on stdin/stdout (or on a Unix socket with --socket), so callers
+pay interpreter startup and imports once instead of per file. ValidationClient
+(and SelfImprovementEngine on the TypeScript side) pipeline requests to it.
+
+`python3 validation.py --batch manifest.jsonl` validates many proposals in one
+process: the cheap gates run across a worker pool, the TypeScript ones share a
+single compile, and verdicts are written as JSON lines.
 """
 
-import subprocess
+import json
 import logging
 import ast
+import difflib
+import os
 import re
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+from typecheck import TypeCheckError, TypeCheckService, TypeCheckUnavailable
+
 logger = logging.getLogger(__name__)
 
 
+def changed_hunks(original: str, proposed: str) -> list[tuple[int, int, int, int]]:
+    """
+    Line ranges of `proposed` that were added or changed relative to `original`.
+
+    Returns:
+        (original start, original end, proposed start, proposed end) per hunk —
+        0-based, end exclusive. Identical leading and trailing lines are skipped
+        before diffing, so a small edit to a large file costs little.
+    """
+    a, b = original.splitlines(), proposed.splitlines()
+    lo, n = 0, min(len(a), len(b))
+    while lo < n and a[lo] == b[lo]:
+        lo += 1
+    hi = 0
+    while hi < n - lo and a[len(a) - 1 - hi] == b[len(b) - 1 - hi]:
+        hi += 1
+    matcher = difflib.SequenceMatcher(None, a[lo:len(a) - hi], b[lo:len(b) - hi])
+    return [(lo + i1, lo + i2, lo + j1, lo + j2)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag in ("replace", "insert")]
+
+
 class RewriteValidator:
     """
     Validates proposed source code rewrites before they are applied.
 
     Safety Gates (in order):
         1. Syntax check (Python AST parse or tsc --noEmit for TypeScript)
-        2. Dangerous pattern scan (rm -rf, process.exit, eval, exec)
+        2. Dangerous pattern scan (rm -rf, process.exit, eval, exec) of added/changed lines only
         3. Size sanity check (reject files that shrink by >80% — likely LLM truncation)
         4. TypeScript compile check (final gate for .ts files)
     """
@@ -35,10 +76,16 @@ class RewriteValidator:
         r"DELETE\s+FROM\s+\w+\s*;?\s*$",
     ]
 
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, typecheck: TypeCheckService | None = None):
         self.project_root = Path(project_root)
+        # Share one service between validators (and the ReplicationEngine) to keep the compiler warm
+        self.typecheck = typecheck or TypeCheckService(project_root)
+        # All patterns in one pass; the named group that matched identifies the pattern
+        self._dangerous = re.compile("|".join(f"(?P<p{i}>{p})" for i, p in enumerate(self.DANGEROUS_PATTERNS)),
+                                     re.IGNORECASE | re.MULTILINE)
 
-    def validate(self, filename: str, original_content: str, proposed_content: str) -> tuple[bool, list[str]]:
+    def validate(self, filename: str, original_content: str, proposed_content: str,
+                 out_of_tree: bool = False) -> tuple[bool, list[str]]:
         """
         Run all safety gates on a proposed rewrite.
 
@@ -46,11 +93,35 @@ class RewriteValidator:
             filename: The source filename being rewritten.
             original_content: The current file content.
             proposed_content: The proposed new file content.
+            out_of_tree: The file is not part of the project (e.g. a Wagon completion), so
+                it is type-checked as a fresh module even if a project file has the same name.
 
         Returns:
             A tuple of (is_valid: bool, reasons: list[str]).
             reasons contains human-readable descriptions of any failures.
         """
+        ok, reasons = self.precheck(filename, original_content, proposed_content)
+        if not ok:
+            return False, reasons
+
+        # Gate 5: TypeScript compile check (for .ts files)
+        if filename.endswith(".ts"):
+            is_valid, tsc_err = self._run_tsc_check(filename, proposed_content, out_of_tree)
+            if not is_valid:
+                reasons.append(f"REJECTED: TypeScript compile failed:\n{tsc_err}")
+                return False, reasons
+
+        reasons.append(f"APPROVED: All {4 if filename.endswith('.ts') else 3} safety gates passed.")
+        return True, reasons
+
+    def precheck(self, filename: str, original_content: str, proposed_content: str) -> tuple[bool, list[str]]:
+        """
+        Gates 1–4: every gate except the TypeScript compile. Cheap and free of
+        shared state, so batches run them in a worker pool.
+
+        Returns:
+            A tuple of (passed: bool, reasons: list[str]).
+        """
         reasons: list[str] = []
 
         # Gate 1: Non-empty check
@@ -68,11 +139,12 @@ class RewriteValidator:
             )
             return False, reasons
 
-        # Gate 3: Dangerous pattern scan
-        for pattern in self.DANGEROUS_PATTERNS:
-            if re.search(pattern, proposed_content, re.IGNORECASE):
-                reasons.append(f"REJECTED: Dangerous pattern detected: `{pattern}`")
-                return False, reasons
+        # Gate 3: Dangerous pattern scan — only hunks the rewrite adds or changes, so
+        # patterns already present in the original are not held against it
+        hit = self._scan_hunks(original_content, proposed_content)
+        if hit is not None:
+            reasons.append(hit)
+            return False, reasons
 
         # Gate 4: Python syntax check (for .py files)
         if filename.endswith(".py"):
@@ -82,55 +154,448 @@ class RewriteValidator:
                 reasons.append(f"REJECTED: Python syntax error: {e}")
                 return False, reasons
 
-        # Gate 5: TypeScript compile check (for .ts files)
-        if filename.endswith(".ts"):
-            is_valid, tsc_err = self._run_tsc_check(filename, proposed_content)
-            if not is_valid:
+        return True, reasons
+
+    def iter_batch(self, items: list[tuple[str, str, str]], jobs: int = 1, out_of_tree: bool = False):
+        """
+        Validate many rewrites, yielding (index, is_valid, reasons) as each verdict is final.
+
+        Gates 1–4 run for every item (across `jobs` processes); the .ts items that pass
+        them are then type-checked together in one compile, so their verdicts come last.
+
+        Args:
+            items: (filename, original content, proposed content) triples.
+            out_of_tree: None of the files are part of the project (see validate()).
+        """
+        if jobs > 1 and len(items) > 1:
+            with ProcessPoolExecutor(jobs, initializer=_init_batch_worker, initargs=(str(self.project_root),)) as pool:
+                prechecked = pool.map(_batch_precheck, items, chunksize=max(1, len(items) // (jobs * 4)))
+                yield from self._finish_batch(items, prechecked, out_of_tree)
+        else:
+            yield from self._finish_batch(items, (self.precheck(*item) for item in items), out_of_tree)
+
+    def _finish_batch(self, items: list[tuple[str, str, str]], prechecked, out_of_tree: bool):
+        compile_group: list[tuple[int, list[str]]] = []
+        for i, (ok, reasons) in enumerate(prechecked):
+            filename = items[i][0]
+            if ok and filename.endswith(".ts"):
+                compile_group.append((i, reasons))
+                continue
+            if ok:
+                reasons.append("APPROVED: All 3 safety gates passed.")
+            yield i, ok, reasons
+        if not compile_group:
+            return
+        checked = self._run_tsc_batch([(items[i][0], items[i][2]) for i, _ in compile_group], out_of_tree)
+        for (i, reasons), (is_valid, tsc_err) in zip(compile_group, checked):
+            if is_valid:
+                reasons.append("APPROVED: All 4 safety gates passed.")
+            else:
                 reasons.append(f"REJECTED: TypeScript compile failed:\n{tsc_err}")
-                return False, reasons
+            yield i, is_valid, reasons
 
-        reasons.append(f"APPROVED: All {4 if filename.endswith('.ts') else 3} safety gates passed.")
-        return True, reasons
+    def validate_batch(self, items: list[tuple[str, str, str]], jobs: int = 1,
+                       out_of_tree: bool = False) -> list[tuple[bool, list[str]]]:
+        """
+        Run all safety gates on many rewrites, with a single compile for the TypeScript ones.
+
+        Args:
+            items: (filename, original content, proposed content) triples.
+            jobs: Worker processes for gates 1–4.
+            out_of_tree: None of the files are part of the project (see validate()).
+
+        Returns:
+            (is_valid, reasons) per item, in order.
+        """
+        results: list[tuple[bool, list[str]]] = [(False, [])] * len(items)
+        for i, ok, reasons in self.iter_batch(items, jobs=jobs, out_of_tree=out_of_tree):
+            results[i] = (ok, reasons)
+        return results
+
+    def _scan_hunks(self, original_content: str, proposed_content: str) -> str | None:
+        """Rejection reason for the first dangerous pattern in an added or changed hunk, or None."""
+        lines = proposed_content.splitlines()
+        for i1, i2, j1, j2 in changed_hunks(original_content, proposed_content):
+            match = self._dangerous.search("\n".join(lines[j1:j2]))
+            if match is None:
+                continue
+            pattern = self.DANGEROUS_PATTERNS[int(match.lastgroup[1:])]
+            line = j1 + match.string.count("\n", 0, match.start())
+            return (f"REJECTED: Dangerous pattern detected: `{pattern}` at line {line + 1}, "
+                    f"in hunk @@ -{i1 + 1},{i2 - i1} +{j1 + 1},{j2 - j1} @@: {lines[line].strip()[:120]}")
+        return None
+
+    def _overlay_path(self, filename: str, out_of_tree: bool = False) -> Path:
+        """
+        Where the proposed content is type-checked: in place of the project file it
+        replaces when `filename` is a path to one (absolute, or relative to the project
+        root or src/), otherwise as a fresh module in src/. Out-of-tree content always
+        gets a fresh module, so it never stands in for a project file of the same name.
+        """
+        path = Path(filename)
+        if not out_of_tree:
+            for candidate in (path, self.project_root / path, self.project_root / "src" / path):
+                if candidate.is_file() and self.project_root.resolve() in candidate.resolve().parents:
+                    return candidate.resolve()
+        return self.project_root / "src" / f".validate-{uuid.uuid4().hex[:12]}{path.suffix or '.ts'}"
 
-    def _run_tsc_check(self, filename: str, proposed_content: str) -> tuple[bool, str]:
+    def _run_tsc_batch(self, entries: list[tuple[str, str]], out_of_tree: bool = False) -> list[tuple[bool, str]]:
         """
-        Write proposed content to a temp file and run tsc --noEmit to check for errors.
+        Type-check several (filename, proposed content) pairs in one compile.
+
+        Each proposal is overlaid at its own path. Errors in an overlaid file belong to
+        that proposal; when a shared importer fails instead, the proposals that look
+        clean are re-checked one by one to find whose change broke it.
+        """
+        targets = [str(self._overlay_path(filename, out_of_tree)) for filename, _ in entries]
+        combined: dict[str, str] = {}
+        alone = []  # A second proposal for a file already in the compile is checked on its own
+        for n, (target, (_, content)) in enumerate(zip(targets, entries)):
+            if target in combined:
+                alone.append(n)
+            else:
+                combined[target] = content
+        try:
+            found = self.typecheck.diagnostics(combined, dependents=True)
+        except TypeCheckUnavailable:
+            logger.warning("tsc not found in PATH — skipping TypeScript compile gate.")
+            return [(True, "tsc unavailable — compile gate skipped.")] * len(entries)
+        except TypeCheckError as e:
+            return [(False, f"TypeScript compile check failed to run: {e}")] * len(entries)
+
+        stray = any(errors for path, errors in found.items() if path not in combined)
+        results = []
+        for n, (target, (filename, content)) in enumerate(zip(targets, entries)):
+            own = found.get(target, [])
+            if own and n not in alone:
+                results.append((False, "\n".join(own)))
+            elif stray or n in alone:
+                results.append(self._run_tsc_check(filename, content, out_of_tree))
+            else:
+                results.append((True, ""))
+        return results
+
+    def _run_tsc_check(self, filename: str, proposed_content: str, out_of_tree: bool = False) -> tuple[bool, str]:
+        """
+        Type-check the proposed content in memory, in place of the file it replaces
+        (or as a fresh module; see _overlay_path).
+
+        The check covers the file and every module that imports it, on the type-check
+        service's warm program. Nothing is written to the source tree, so validations
+        can run concurrently.
 
         Args:
-            filename: The original filename (used to preserve extension).
+            filename: The file being rewritten (path relative to the project root or src/).
             proposed_content: The proposed new TypeScript content.
+            out_of_tree: Always check as a fresh module.
 
         Returns:
-            A tuple of (is_valid: bool, error_output: str).
+            A tuple of (is_valid: bool, error_output: str). Validation is advisory: without a
+            TypeScript compiler this gate is skipped and passes. ReplicationEngine's apply
+            gate fails closed instead.
         """
-        import tempfile
-        import os
-
-        suffix = Path(filename).suffix
-        with tempfile.NamedTemporaryFile(
-            mode="w",
-            suffix=suffix,
-            dir=str(self.project_root / "src"),
-            delete=False,
-            encoding="utf-8",
-        ) as tmp:
-            tmp.write(proposed_content)
-            tmp_path = tmp.name
-
+        target = self._overlay_path(filename, out_of_tree)
         try:
-            result = subprocess.run(
-                ["npx", "tsc", "--noEmit", "--skipLibCheck"],
-                cwd=str(self.project_root),
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-            return result.returncode == 0, result.stdout + result.stderr
-        except subprocess.TimeoutExpired:
-            return False, "TypeScript compile check timed out."
-        except FileNotFoundError:
+            ok, errors = self.typecheck.check({str(target): proposed_content}, dependents=True)
+        except TypeCheckUnavailable:
             # tsc not available — skip this gate
             logger.warning("tsc not found in PATH — skipping TypeScript compile gate.")
             return True, "tsc unavailable — compile gate skipped."
-        finally:
-            os.unlink(tmp_path)
\ No newline at end of file
+        except TypeCheckError as e:
+            return False, f"TypeScript compile check failed to run: {e}"
+        return ok, "\n".join(errors)
+
+
+_batch_validator: RewriteValidator | None = None
+
+
+def _init_batch_worker(project_root: str):
+    global _batch_validator
+    _batch_validator = RewriteValidator(project_root)
+
+
+def _batch_precheck(item: tuple[str, str, str]) -> tuple[bool, list[str]]:
+    return _batch_validator.precheck(*item)
+
+
+def run_batch(validator: RewriteValidator, manifest: str, out, jobs: int = 1,
+              out_of_tree: bool = False) -> tuple[int, int]:
+    """
+    Validate every proposal in a JSONL manifest and write one verdict line per entry.
+
+    Manifest lines: {"filename": ..., "original": path, "proposed": path}. Paths are
+    relative to the manifest; a missing "original" means a new file. Verdicts
+    ({"index", "filename", "ok", "reasons"}) are written as soon as they are final, so
+    TypeScript entries come after the rest.
+
+    Returns:
+        (entries, entries approved)
+    """
+    base = Path(manifest).parent
+    items, entries = [], []
+    rejected: list[tuple[int, dict, str]] = []
+    with open(manifest, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            index = len(entries) + len(rejected)
+            entry = {}
+            try:
+                entry = json.loads(line)
+                original = entry.get("original")
+                items.append((
+                    entry["filename"],
+                    (base / original).read_text(encoding="utf-8") if original else "",
+                    (base / entry["proposed"]).read_text(encoding="utf-8"),
+                ))
+                entries.append((index, entry))
+            except (ValueError, KeyError, TypeError, AttributeError, OSError) as e:
+                rejected.append((index, entry if isinstance(entry, dict) else {},
+                                 f"REJECTED: Bad manifest entry: {type(e).__name__}: {e}"))
+
+    def emit(index: int, filename, ok: bool, reasons: list[str]):
+        out.write(json.dumps({"index": index, "filename": filename, "ok": ok, "reasons": reasons}) + "\n")
+        out.flush()
+
+    for index, entry, reason in rejected:
+        emit(index, entry.get("filename"), False, [reason])
+    approved = 0
+    for n, ok, reasons in validator.iter_batch(items, jobs=jobs, out_of_tree=out_of_tree):
+        emit(entries[n][0], items[n][0], ok, reasons)
+        approved += ok
+    return len(entries) + len(rejected), approved
+
+
+# ─── Validation Worker ─────────────────────────────────────────────────────────
+#
+# Protocol: one JSON object per line in each direction.
+#   → {"id": 1, "op": "validate", "filename": "x.ts", "original": "...", "proposed": "...", "out_of_tree": false}
+#   ← {"id": 1, "ok": true, "reasons": ["APPROVED: ..."]}
+#   → {"id": 2, "op": "validate_batch", "items": [{"filename": ..., "original": ..., "proposed": ...}],
+#      "out_of_tree": false}
+#   ← {"id": 2, "ok": false, "results": [{"ok": true, "reasons": [...]}, ...]}
+#   → {"id": 3, "op": "ping"}            ← {"id": 3, "ok": true}
+# "out_of_tree": true type-checks content that is not a project file (see RewriteValidator.validate).
+# A request that cannot be handled gets {"id": ..., "ok": false, "error": "..."}.
+# Responses to .ts requests (TypeScript compile gate) may overtake earlier ones, so
+# clients match them by id.
+
+def handle_request(validator: RewriteValidator, request: dict) -> dict:
+    """Answer one worker request."""
+    op = request.get("op", "validate")
+    if op == "ping":
+        return {"id": request.get("id"), "ok": True}
+    if op == "validate_batch":
+        items = [(item["filename"], item.get("original", ""), item["proposed"]) for item in request["items"]]
+        results = [{"ok": ok, "reasons": reasons}
+                   for ok, reasons in validator.validate_batch(items, out_of_tree=bool(request.get("out_of_tree")))]
+        return {"id": request.get("id"), "ok": all(r["ok"] for r in results), "results": results}
+    if op != "validate":
+        raise ValueError(f"Unknown op '{op}'")
+    ok, reasons = validator.validate(request["filename"], request.get("original", ""), request["proposed"],
+                                     out_of_tree=bool(request.get("out_of_tree")))
+    return {"id": request.get("id"), "ok": ok, "reasons": reasons}
+
+
+def serve(validator: RewriteValidator, reader, writer, threads: int = 4):
+    """
+    Answer JSON-line requests from `reader` on `writer` until EOF.
+
+    Requests without a compile gate are answered inline (well under a millisecond);
+    TypeScript requests and batches go to a thread pool so they do not hold up the stream.
+    """
+    write_lock = threading.Lock()
+
+    def respond(response: dict):
+        line = json.dumps(response) + "\n"
+        with write_lock:
+            writer.write(line)
+            writer.flush()
+
+    def run(request: dict):
+        try:
+            respond(handle_request(validator, request))
+        except Exception as e:  # A bad request must not take the worker down
+            respond({"id": request.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="validate") as pool:
+        for line in reader:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                respond({"id": None, "ok": False, "error": f"Invalid JSON: {e}"})
+                continue
+            if request.get("op") == "validate_batch" or str(request.get("filename", "")).endswith(".ts"):
+                pool.submit(run, request)
+            else:
+                run(request)
+
+
+def serve_socket(validator: RewriteValidator, socket_path: str, threads: int = 4):
+    """Serve the worker protocol on a Unix socket, one thread per connection."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = (line.decode("utf-8") for line in self.rfile)
+            writer = self.wfile
+
+            class TextWriter:
+                def write(self, text: str):
+                    writer.write(text.encode("utf-8"))
+
+                def flush(self):
+                    writer.flush()
+
+            serve(validator, reader, TextWriter(), threads=threads)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        logger.info(f"Validation worker listening on {socket_path}")
+        server.serve_forever()
+
+
+class ValidationClient:
+    """
+    Client for a validation worker. Requests are pipelined: submit() returns at once
+    and any number of requests may be in flight.
+
+    Spawns `validation.py --serve` for `project_root`, or connects to a worker's
+    Unix socket when `socket_path` is given.
+    """
+
+    def __init__(self, project_root: str = ".", socket_path: str | None = None, python: str = sys.executable):
+        self._proc = None
+        if socket_path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(socket_path)
+            self._reader = self._sock.makefile("r", encoding="utf-8")
+            self._writer = self._sock.makefile("w", encoding="utf-8")
+        else:
+            self._sock = None
+            self._proc = subprocess.Popen([python, str(Path(__file__).resolve()), "--serve", "--root", project_root],
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8")
+            self._reader, self._writer = self._proc.stdout, self._proc.stdin
+        self._pending: dict[int, Future] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._read_loop, daemon=True, name="validation-client").start()
+
+    def _read_loop(self):
+        for line in self._reader:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                future = self._pending.pop(response.get("id"), None)
+            if future is None:
+                continue
+            if "error" in response:
+                future.set_exception(RuntimeError(f"Validation worker error: {response['error']}"))
+            elif "results" in response:
+                future.set_result([(r["ok"], r["reasons"]) for r in response["results"]])
+            else:
+                future.set_result((response["ok"], response.get("reasons", [])))
+        with self._lock:
+            waiting = list(self._pending.values())
+            self._pending.clear()
+        for future in waiting:
+            future.set_exception(RuntimeError("Validation worker exited"))
+
+    def _send(self, request: dict) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._seq += 1
+            self._pending[self._seq] = future
+            self._writer.write(json.dumps({"id": self._seq, **request}) + "\n")
+            self._writer.flush()
+        return future
+
+    def submit(self, filename: str, original_content: str, proposed_content: str,
+               out_of_tree: bool = False) -> Future:
+        """Queue a validation. The future resolves to (is_valid, reasons)."""
+        return self._send({"op": "validate", "filename": filename, "original": original_content,
+                           "proposed": proposed_content, "out_of_tree": out_of_tree})
+
+    def submit_batch(self, items: list[tuple[str, str, str]], out_of_tree: bool = False) -> Future:
+        """Queue a batch of (filename, original, proposed). The future resolves to [(is_valid, reasons)]."""
+        return self._send({"op": "validate_batch", "out_of_tree": out_of_tree, "items": [
+            {"filename": filename, "original": original, "proposed": proposed}
+            for filename, original, proposed in items]})
+
+    def validate(self, filename: str, original_content: str, proposed_content: str,
+                 out_of_tree: bool = False, timeout: float | None = None) -> tuple[bool, list[str]]:
+        return self.submit(filename, original_content, proposed_content, out_of_tree).result(timeout)
+
+    def validate_batch(self, items: list[tuple[str, str, str]], out_of_tree: bool = False,
+                       timeout: float | None = None) -> list[tuple[bool, list[str]]]:
+        return self.submit_batch(items, out_of_tree).result(timeout)
+
+    def close(self):
+        try:
+            self._writer.close()
+        except OSError:
+            pass
+        if self._proc is not None:
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        if self._sock is not None:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ─── CLI Entry Point ───────────────────────────────────────────────────────────
+
+def main():
+    """Run the validation worker, or validate a batch manifest."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Self-R Meta Layer: Rewrite Validation")
+    parser.add_argument("--root", default=".", help="Self-R project root directory")
+    parser.add_argument("--serve", action="store_true", help="Answer JSON-line validate requests on stdin/stdout")
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent TypeScript validations")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help='Validate a JSONL manifest of {"filename", "original", "proposed"} file paths')
+    parser.add_argument("--out", help="Write batch verdicts (JSONL) here instead of stdout")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the batch's cheap gates")
+    parser.add_argument("--out-of-tree", action="store_true",
+                        help="Batch files are not project files (e.g. completions); type-check each as a fresh module")
+    args = parser.parse_args()
+
+    if not (args.serve or args.socket or args.batch):
+        parser.error("nothing to do (use --serve, --socket or --batch)")
+    # stdout carries the protocol (or verdicts), so logs go to stderr
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s", stream=sys.stderr)
+    validator = RewriteValidator(args.root)
+    try:
+        if args.batch:
+            out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+            try:
+                total, approved = run_batch(validator, args.batch, out, jobs=args.jobs, out_of_tree=args.out_of_tree)
+            finally:
+                if args.out:
+                    out.close()
+            logger.info(f"Batch validation: {approved}/{total} approved.")
+            raise SystemExit(0 if approved == total else 1)
+        if args.socket:
+            serve_socket(validator, args.socket, threads=args.threads)
+        else:
+            serve(validator, sys.stdin, sys.stdout, threads=args.threads)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        validator.typecheck.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -75,6 +75,23 @@ export function startUIServer(port: number = 8080, role: string = 'CORE', ringma
     app.use(express.static(uiPath));
     app.use(express.json()); // enable json body parsing
 
+    // Ringmaster tracing: echo the trace ID and drop work whose deadline has already passed
+    app.use((req, res, next) => {
+        const traceId = req.header('x-trace-id');
+        if (traceId) res.setHeader('X-Trace-Id', traceId);
+        const budgetMs = Number(req.header('x-deadline-ms'));
+        if (req.header('x-deadline-ms') !== undefined && Number.isFinite(budgetMs)) {
+            if (budgetMs <= 0) return res.status(504).json({ error: 'Deadline exceeded before processing.' });
+            res.locals.deadline = Date.now() + budgetMs;
+        }
+        next();
+    });
+
+    // Cheap liveness probe used by the Ringmaster to confirm restored nodes after a hub restart
+    app.get('/api/health', (req, res) => {
+        res.json({ status: 'ok', role, uptime: process.uptime() });
+    });
+
     // File Management Endpoints for Proxmox UI
     const completionsDir = path.join(process.cwd(), 'completions');
 
@@ -82,7 +99,15 @@ export function startUIServer(port: number = 8080, role: string = 'CORE', ringma
         try {
             if (!fs.existsSync(completionsDir)) fs.mkdirSync(completionsDir, { recursive: true });
             const files = fs.readdirSync(completionsDir);
-            res.json({ files });
+            if (req.query.meta !== '1') return res.json({ files });
+            // ?meta=1 adds size/mtime so the Ringmaster can detect changed files without downloading them
+            const entries = files.flatMap(name => {
+                try {
+                    const st = fs.statSync(path.join(completionsDir, name));
+                    return st.isFile() ? [{ name, size: st.size, mtime: st.mtimeMs }] : [];
+                } catch { return []; }
+            });
+            res.json({ files, entries });
         } catch (e: any) { res.status(500).json({ error: e.toString() }); }
     });
 
@@ -128,31 +153,34 @@ CURRENT CONTENT:
 ${content}
 
 Provide the complete corrected file, fixing ONLY the described issue. Output ONLY the raw code with no markdown fences.`;
+            const providerStart = Date.now();
             const proposed_content = await llm.generateResponse(prompt, 'You are an expert code refactoring bot. Output only raw code.');
+            setServerTiming(res, 'provider', providerStart);
             broadcastLog('MetaLayer', `Rewrite proposal generated for ${filename} via ${provider}.`);
             res.json({ proposed_content });
         } catch (e: any) { res.status(500).json({ error: e.toString() }); }
     });
 
-    // Meta Layer Bridge: LLM-powered code quality audit
+    // Meta Layer Bridge: LLM-powered code quality audit.
+    // Body: { filename, content, mode? } for one file, or { files: [{ filename, content }], mode? } → { results: [...] }.
     app.post('/api/analyze', async (req, res) => {
         try {
-            const { filename, content, mode = 'quality_audit' } = req.body;
+            const { filename, content, files, mode = 'quality_audit' } = req.body;
+            if (Array.isArray(files)) {
+                if (files.some((f: any) => !f || !f.filename || !f.content)) {
+                    return res.status(400).json({ error: 'every entry in files needs filename and content.' });
+                }
+                const providerStart = Date.now();
+                const results = await auditBatch(files, mode);
+                setServerTiming(res, 'provider', providerStart);
+                return res.json({ results });
+            }
             if (!filename || !content) {
                 return res.status(400).json({ error: 'filename and content are required.' });
             }
-            const llm = LLMFactory.getProvider('Kimi'); // Use best reasoner for analysis
-            const prompt = `Perform a ${mode} on the following source file.
-
-FILE: ${filename}
-CONTENT:
-${content}
-
-Return a JSON object with these keys: { "score": 0-10, "issues": ["..."], "suggestions": ["..."] }.
-Output strictly JSON, no markdown.`;
-            const raw = await llm.generateResponse(prompt, 'You are a senior code quality auditor. Output strict JSON only.');
-            const jsonMatch = raw.match(/\{[\s\S]*\}/);
-            const result = jsonMatch ? JSON.parse(jsonMatch[0]) : { score: 0, issues: ['Parse failed'], suggestions: [] };
+            const providerStart = Date.now();
+            const result = await auditSource(filename, content, mode);
+            setServerTiming(res, 'provider', providerStart);
             res.json(result);
         } catch (e: any) { res.status(500).json({ error: e.toString() }); }
     });
@@ -184,9 +212,15 @@ Output strictly JSON, no markdown.`;
             const overrides: RoundTableOverrides = { visionary, critic, tactician };
 
             ioInstance?.emit('debate-phase', { phase: 1, agent: visionary, status: 'DRAFTING...' });
+            const debateStart = Date.now();
             const planResult = await initializeOrchestrator(objective, overrides);
+            setServerTiming(res, 'debate', debateStart);
 
             if (auto_approve) {
+                if (res.locals.deadline && Date.now() > res.locals.deadline) {
+                    broadcastLog('main', '> Deadline exceeded after debate. Dropping swarm deployment.');
+                    return res.status(504).json({ error: 'Deadline exceeded before swarm deployment.', plan: planResult });
+                }
                 broadcastLog('main', '> Auto-Approve enabled. Deploying Swarm directly...');
                 ioInstance?.emit('swarm-starting');
                 const builder = new SwarmBuilder(objective);
@@ -204,6 +238,21 @@ Output strictly JSON, no markdown.`;
         }
     });
 
+    // Human review of a pending plan — the Ringmaster relays APPROVE / CANCEL from its /ws channel
+    app.post('/api/swarm/approve', async (req, res) => {
+        if (!currentPendingPlan) return res.status(409).json({ error: 'No plan awaiting approval.' });
+        try {
+            await approvePendingPlan(req.body?.tasks);
+            res.json({ success: true, status: 'Swarm executed successfully.' });
+        } catch (e: any) {
+            res.status(500).json({ error: e.toString() });
+        }
+    });
+
+    app.post('/api/swarm/reject', (req, res) => {
+        res.json({ success: true, rejected: rejectPendingPlan() });
+    });
+
     // Self-Improvement Cycle — wired to Ringmaster Hub "IMPROVE" button
     app.post('/api/self-improve', async (req, res) => {
         const nodeServerUrl = `http://localhost:${port}`;
@@ -247,25 +296,11 @@ Output strictly JSON, no markdown.`;
         });
 
         socket.on('approve-plan', async (data) => {
-            if (!currentPendingPlan) return;
-            try {
-                broadcastLog('main', '> Swarm Plan APPROVED. Human Commander override confirmed. Deploying... ');
-                io.emit('swarm-starting');
-                const builder = new SwarmBuilder(currentPendingPlan.objective);
-                await builder.delegateToSwarm(data.tasks || currentPendingPlan.tasks);
-                io.emit('swarm-done', { success: true });
-            } catch (err) {
-                console.error(chalk.red('[SwarmBuilder Trigger] Execution failed: ' + err));
-                io.emit('swarm-done', { success: false, error: String(err) });
-            }
-            currentPendingPlan = null;
+            await approvePendingPlan(data?.tasks).catch(() => { /* reported via swarm-done */ });
         });
 
         socket.on('reject-plan', () => {
-            if (!currentPendingPlan) return;
-            broadcastLog('main', '> Swarm Plan REJECTED. Human Commander aborted execution.');
-            io.emit('swarm-done', { success: false, error: 'Aborted by human commander.' });
-            currentPendingPlan = null;
+            rejectPendingPlan();
         });
 
         socket.on('disconnect', () => {
@@ -279,6 +314,77 @@ Output strictly JSON, no markdown.`;
     });
 }
 
+/** Run one LLM quality audit. Resolves to { score, issues, suggestions }. */
+async function auditSource(filename: string, content: string, mode: string): Promise<any> {
+    const llm = LLMFactory.getProvider('Kimi'); // Use best reasoner for analysis
+    const prompt = `Perform a ${mode} on the following source file.
+
+FILE: ${filename}
+CONTENT:
+${content}
+
+Return a JSON object with these keys: { "score": 0-10, "issues": ["..."], "suggestions": ["..."] }.
+Output strictly JSON, no markdown.`;
+    const raw = await llm.generateResponse(prompt, 'You are a senior code quality auditor. Output strict JSON only.');
+    const jsonMatch = raw.match(/\{[\s\S]*\}/);
+    return jsonMatch ? JSON.parse(jsonMatch[0]) : { score: 0, issues: ['Parse failed'], suggestions: [] };
+}
+
+const AUDIT_BATCH_CONCURRENCY = 4;
+
+/** Audit several files, a few at a time. A failed file yields { score: 0, issues, suggestions, error } in its slot. */
+async function auditBatch(files: { filename: string, content: string }[], mode: string): Promise<any[]> {
+    const results: any[] = new Array(files.length);
+    let next = 0;
+    const worker = async () => {
+        while (next < files.length) {
+            const i = next++;
+            try {
+                results[i] = await auditSource(files[i].filename, files[i].content, mode);
+            } catch (e: any) {
+                results[i] = { score: 0, issues: [e.toString()], suggestions: [], error: e.toString() };
+            }
+        }
+    };
+    await Promise.all(Array.from({ length: Math.min(AUDIT_BATCH_CONCURRENCY, files.length) }, worker));
+    return results;
+}
+
+/** Deploy the plan awaiting human review (optionally with edited tasks). Resolves false when there is none. */
+async function approvePendingPlan(tasks?: SwarmTask[]): Promise<boolean> {
+    const plan = currentPendingPlan;
+    if (!plan) return false;
+    currentPendingPlan = null;
+    try {
+        broadcastLog('main', '> Swarm Plan APPROVED. Human Commander override confirmed. Deploying... ');
+        ioInstance?.emit('swarm-starting');
+        const builder = new SwarmBuilder(plan.objective);
+        await builder.delegateToSwarm(tasks || plan.tasks);
+        ioInstance?.emit('swarm-done', { success: true });
+        return true;
+    } catch (err) {
+        console.error(chalk.red('[SwarmBuilder Trigger] Execution failed: ' + err));
+        ioInstance?.emit('swarm-done', { success: false, error: String(err) });
+        throw err;
+    }
+}
+
+/** Drop the plan awaiting human review. Returns false when there was none. */
+function rejectPendingPlan(): boolean {
+    if (!currentPendingPlan) return false;
+    broadcastLog('main', '> Swarm Plan REJECTED. Human Commander aborted execution.');
+    ioInstance?.emit('swarm-done', { success: false, error: 'Aborted by human commander.' });
+    currentPendingPlan = null;
+    return true;
+}
+
+/** Append a phase duration to the Server-Timing header so the Ringmaster can build its trace waterfall. */
+function setServerTiming(res: express.Response, name: string, startMs: number) {
+    const entry = `${name};dur=${Date.now() - startMs}`;
+    const prev = res.getHeader('Server-Timing');
+    res.setHeader('Server-Timing', prev ? `${prev}, ${entry}` : entry);
+}
+
 export function broadcastLog(agent: string, message: string) {
     if (ioInstance) {
         ioInstance.emit('swarm-log', { agent, message });
@@ -12,14 +12,12 @@
  *  - POST /api/self-improve endpoint (manual trigger via Ringmaster Hub)
  */
 
-import { exec } from 'child_process';
-import { promisify } from 'util';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import * as fs from 'fs';
 import * as path from 'path';
+import * as readline from 'readline';
 import { broadcastLog } from '../server/WebSocketServer';
 
-const execAsync = promisify(exec);
-
 export interface ImprovementResult {
     filename: string;
     originalScore: number;
@@ -39,6 +37,95 @@ export interface ImprovementReport {
     durationMs: number;
 }
 
+interface ValidationResponse {
+    id: number;
+    ok: boolean;
+    reasons?: string[];
+    error?: string;
+}
+
+/**
+ * Long-lived `validation.py --serve` process, shared by every engine for a project root.
+ *
+ * Requests are pipelined as JSON lines and matched to responses by id, so the
+ * interpreter starts (and imports validation.py) once instead of per file. A worker
+ * that exits is restarted by the next request.
+ */
+class ValidationWorker {
+    private static workers = new Map<string, ValidationWorker>();
+    private proc: ChildProcessWithoutNullStreams | null = null;
+    private pending = new Map<number, { resolve: (r: ValidationResponse) => void; reject: (e: Error) => void }>();
+    private seq = 0;
+
+    private constructor(private projectRoot: string) {}
+
+    static for(projectRoot: string): ValidationWorker {
+        let worker = ValidationWorker.workers.get(projectRoot);
+        if (!worker) {
+            worker = new ValidationWorker(projectRoot);
+            ValidationWorker.workers.set(projectRoot, worker);
+        }
+        return worker;
+    }
+
+    private start(): ChildProcessWithoutNullStreams {
+        if (this.proc) return this.proc;
+        const script = path.join(this.projectRoot, 'src/meta/validation.py');
+        const proc = spawn('python3', [script, '--serve', '--root', this.projectRoot], { cwd: this.projectRoot });
+
+        readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+            let response: ValidationResponse;
+            try {
+                response = JSON.parse(line);
+            } catch {
+                return;
+            }
+            const waiter = this.pending.get(response.id);
+            if (!waiter) return;
+            this.pending.delete(response.id);
+            if (response.error) waiter.reject(new Error(response.error));
+            else waiter.resolve(response);
+        });
+        proc.stderr.resume(); // Worker logs — drained so the pipe never fills
+
+        const fail = (err: Error) => this.stop(proc, err);
+        proc.on('exit', (code) => fail(new Error(`validation worker exited (code ${code})`)));
+        proc.on('error', fail);
+        proc.stdin.on('error', fail);
+
+        this.proc = proc;
+        return proc;
+    }
+
+    /** Kill a worker and reject every request still waiting on it; the next request spawns a fresh one. */
+    private stop(proc: ChildProcessWithoutNullStreams, err: Error): void {
+        if (this.proc !== proc) return;
+        this.proc = null;
+        proc.kill();
+        for (const waiter of this.pending.values()) waiter.reject(err);
+        this.pending.clear();
+    }
+
+    validate(filename: string, original: string, proposed: string, timeoutMs = 30000): Promise<ValidationResponse> {
+        const proc = this.start();
+        const id = ++this.seq;
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`validation timed out after ${timeoutMs}ms`));
+                // A stuck worker would stall every later request: replace it
+                this.stop(proc, new Error(`validation worker restarted after a ${timeoutMs}ms timeout`));
+            }, timeoutMs);
+            this.pending.set(id, {
+                resolve: (r) => { clearTimeout(timer); resolve(r); },
+                reject: (e) => { clearTimeout(timer); reject(e); },
+            });
+            // Completions are not project files: check them as fresh modules, never in place of a same-named source file
+            proc.stdin.write(JSON.stringify({ id, op: 'validate', filename, original, proposed, out_of_tree: true }) + '\n');
+        });
+    }
+}
+
 export class SelfImprovementEngine {
     private projectRoot: string;
     private completionsDir: string;
@@ -203,7 +290,8 @@ export class SelfImprovementEngine {
     }
 
     /**
-     * Run the Python validation.py safety gates on a proposed rewrite.
+     * Run the Python validation.py safety gates on a proposed rewrite, via the
+     * shared validation worker.
      *
      * Args:
      *   filename: Source filename.
@@ -214,39 +302,14 @@ export class SelfImprovementEngine {
      *   True if all safety gates pass, false otherwise.
      */
     private async runPythonValidation(filename: string, original: string, proposed: string): Promise<boolean> {
-        const validationScript = path.join(this.projectRoot, 'src/meta/validation.py');
-        const tmpOriginal = path.join(this.projectRoot, `_tmp_orig_${Date.now()}.txt`);
-        const tmpProposed = path.join(this.projectRoot, `_tmp_prop_${Date.now()}.txt`);
-
         try {
-            fs.writeFileSync(tmpOriginal, original, 'utf8');
-            fs.writeFileSync(tmpProposed, proposed, 'utf8');
-
-            const validationRunner = `
-import sys
-sys.path.insert(0, '${this.projectRoot}/src/meta')
-from validation import RewriteValidator
-v = RewriteValidator('${this.projectRoot.replace(/\\/g, '/')}')
-orig = open('${tmpOriginal.replace(/\\/g, '/')}').read()
-prop = open('${tmpProposed.replace(/\\/g, '/')}').read()
-ok, reasons = v.validate('${filename}', orig, prop)
-print('PASS' if ok else 'FAIL')
-for r in reasons: print(r)
-`.trim();
-
-            const { stdout } = await execAsync(`python3 -c "${validationRunner.replace(/"/g, '\\"')}"`, {
-                cwd: this.projectRoot,
-                timeout: 30000,
-            });
-
-            return stdout.trim().startsWith('PASS');
+            const { ok, reasons } = await ValidationWorker.for(this.projectRoot).validate(filename, original, proposed);
+            if (!ok) broadcastLog('SelfImprove', `✗ ${filename}: ${(reasons ?? []).join(' ')}`);
+            return ok;
         } catch (e) {
             // If Python validation unavailable, log and skip (fail-safe)
             broadcastLog('SelfImprove', `⚠ Python validation unavailable: ${e}. Skipping patch.`);
             return false;
-        } finally {
-            try { fs.unlinkSync(tmpOriginal); } catch { /* ignore */ }
-            try { fs.unlinkSync(tmpProposed); } catch { /* ignore */ }
         }
     }
 }
@@ -17,8 +17,11 @@ cd Self-R
 if [ ! -d "node_modules" ]; then
     echo "First time setup: Installing Node dependencies..."
     npm install
-    npm run build
 fi
 
+# Always rebuild: dist/ is compiled output and must match src/ (routes, worker, health probe)
+echo "Compiling TypeScript..."
+npm run build || { echo "Build failed — refusing to start a stale dist/."; exit 1; }
+
 # Run the node
 node ./bin/replacater.js serve -p $PORT --role $ROLE --ringmaster $RINGMASTER_URL